@@ -0,0 +1,94 @@
+"""
+Load test comparing the sync and async user detail endpoints at rising concurrency.
+
+Run it against a server started with a single worker, e.g.
+
+    gunicorn -w 1 -k uvicorn.workers.UvicornWorker user_directory.asgi:application
+    python benchmarks/async_concurrency.py --base-url http://localhost:8000 \
+        --username admin --password adminpassword --concurrency 1 8 32 64
+
+Requests per second that keep rising with concurrency on the async endpoint,
+while the sync one flattens, is the concurrency gained per worker. Both
+endpoints apply the default user throttle, so raise it for the benchmark run;
+throttled requests are reported in the errors column.
+"""
+import argparse
+import statistics
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+
+
+def login(base_url, username, password):
+    """Log in through the HTML form and return an opener carrying the session cookie."""
+    jar = CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    opener.open(f'{base_url}/login/').read()
+    csrftoken = next(cookie.value for cookie in jar if cookie.name == 'csrftoken')
+    body = urllib.parse.urlencode({
+        'username': username,
+        'password': password,
+        'csrfmiddlewaretoken': csrftoken,
+    }).encode()
+    request = urllib.request.Request(f'{base_url}/login/', data=body, headers={'Referer': f'{base_url}/login/'})
+    opener.open(request).read()
+    if not any(cookie.name == 'sessionid' for cookie in jar):
+        raise SystemExit('Login failed')
+    return opener
+
+
+def timed_get(opener, url):
+    """Return (latency in seconds, ok)."""
+    start = time.perf_counter()
+    try:
+        with opener.open(url) as response:
+            response.read()
+        ok = True
+    except urllib.error.HTTPError as exc:
+        exc.read()
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def run(opener, url, concurrency, total):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda _: timed_get(opener, url), range(total)))
+        elapsed = time.perf_counter() - start
+    latencies = sorted(latency for latency, ok in results if ok)
+    errors = total - len(latencies)
+    if len(latencies) < 2:
+        return 0.0, float('nan'), float('nan'), errors
+    quantiles = statistics.quantiles(latencies, n=100)
+    return len(latencies) / elapsed, quantiles[49] * 1000, quantiles[94] * 1000, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--username', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--user-id', type=int, default=1, help='User the detail endpoints are fetched for')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 64])
+    parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and concurrency level')
+    args = parser.parse_args()
+
+    base_url = args.base_url.rstrip('/')
+    opener = login(base_url, args.username, args.password)
+    endpoints = {
+        'sync': f'{base_url}/api/users/{args.user_id}/',
+        'async': f'{base_url}/api/async/users/{args.user_id}/',
+    }
+
+    print(f"{'endpoint':<8} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for concurrency in args.concurrency:
+        for name, url in endpoints.items():
+            rps, p50, p95, errors = run(opener, url, concurrency, args.requests)
+            print(f'{name:<8} {concurrency:>5} {rps:>9.1f} {p50:>8.1f} {p95:>8.1f} {errors:>7}')
+
+
+if __name__ == '__main__':
+    main()
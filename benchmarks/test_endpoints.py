@@ -0,0 +1,350 @@
+"""
+Latency and query-count benchmarks for every route in users/urls.py and
+user_directory/urls.py.
+
+    pytest benchmarks --benchmark-users 100000 --benchmark-output bench.json
+
+Each route is requested ``--benchmark-iterations`` times against a directory
+seeded with ``--benchmark-users`` users; p50/p95/p99 latency and the maximum
+number of queries per request are checked against thresholds.json. Routes
+prepared with ``clear_cache`` start every request with an empty cache so the
+database path is what gets measured; the ``_warm`` variants measure cache hits.
+Record a new baseline with ``--benchmark-update-thresholds`` (see the README).
+"""
+import base64
+import itertools
+import json
+import os
+import statistics
+from pathlib import Path
+from time import perf_counter, process_time
+from types import SimpleNamespace
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.throttling import SimpleRateThrottle
+
+from users.renderers import ORJSONRenderer
+from users.serializers import CustomTokenObtainPairSerializer, UserSerializer
+
+import user_directory.urls
+import users.urls
+
+User = get_user_model()
+
+THRESHOLDS = json.loads((Path(__file__).parent / 'thresholds.json').read_text())
+LATENCY_FACTOR = float(os.environ.get('BENCHMARK_LATENCY_FACTOR', 1))
+WARMUP = 2
+
+_sequence = itertools.count()
+
+
+def unique_name():
+    return f'benchnew{os.getpid()}x{next(_sequence)}'
+
+
+def registration_data(ctx):
+    name = unique_name()
+    return {'username': name, 'email': f'{name}@example.com', 'password': 'Xy7!benchpass', 'password2': 'Xy7!benchpass',
+            'first_name': 'Bench', 'last_name': 'User'}
+
+
+def form_registration_data(ctx):
+    name = unique_name()
+    return {'username': name, 'email': f'{name}@example.com', 'password1': 'Xy7!benchpass', 'password2': 'Xy7!benchpass',
+            'first_name': 'Bench', 'last_name': 'User'}
+
+
+def import_data(ctx):
+    return [{'username': unique_name(), 'email': 'imported@example.com'} for _ in range(10)]
+
+
+def login_again(client, ctx):
+    client.force_login(ctx.user)
+
+
+def clear_cache(client, ctx):
+    cache.clear()
+
+
+class Route:
+    def __init__(self, name, url_name, method='get', role='user', url=None, data=None, query=None,
+                 content_type=None, status=200, iterations=None, prepare=None):
+        self.name = name
+        self.url_name = url_name
+        self.method = method
+        self.role = role
+        self.url = url or (lambda ctx: reverse(url_name))
+        self.data = data
+        self.query = query
+        self.content_type = content_type
+        self.status = status
+        self.iterations = iterations
+        self.prepare = prepare
+
+
+ROUTES = [
+    Route('home', 'home', role='anon'),
+    Route('register', 'register', role='anon'),
+    Route('register_post', 'register', method='post', role='anon', data=form_registration_data, status=302, iterations=5),
+    Route('login', 'login', role='anon'),
+    Route('login_post', 'login', method='post', role='anon', status=302, iterations=5,
+          data=lambda ctx: {'username': ctx.user.username, 'password': 'benchpass123'}),
+    Route('logout', 'logout', method='post', status=302, prepare=login_again),
+    Route('user_list', 'user_list'),
+    Route('user_list_admin', 'user_list', role='admin'),
+    Route('user_profile', 'user_profile'),
+    Route('user_update', 'user_update', url=lambda ctx: reverse('user_update', args=[ctx.user.id])),
+    Route('user_detail', 'user_detail', url=lambda ctx: reverse('user_detail', args=[ctx.user.id]), prepare=clear_cache),
+    Route('api_register', 'api_register', method='post', role='anon', data=registration_data, status=201, iterations=5),
+    Route('api_login', 'api_login', method='post', role='anon', status=200, iterations=5,
+          data=lambda ctx: {'username': ctx.user.username, 'password': 'benchpass123'}),
+    Route('api_user_list', 'api_user_list', query={'page_size': 50}, prepare=clear_cache),
+    Route('api_user_list_deep', 'api_user_list', query={'page_size': 50, 'username': 'bench0009'}, prepare=clear_cache),
+    Route('api_user_list_search', 'api_user_list', query={'page_size': 50, 'search': 'Last99'}, prepare=clear_cache),
+    Route('api_user_list_fields', 'api_user_list', query={'page_size': 50, 'fields': 'id,username'}, prepare=clear_cache),
+    Route('api_user_list_warm', 'api_user_list', query={'page_size': 50}),
+    Route('api_user_import', 'api_user_import', method='post', role='admin', data=import_data,
+          content_type='application/json', iterations=10),
+    Route('api_user_export', 'api_user_export', role='admin', query={'username': 'bench00001'}),
+    Route('api_user_detail', 'api_user_detail', url=lambda ctx: reverse('api_user_detail', args=[ctx.user.id]),
+          prepare=clear_cache),
+    Route('api_user_detail_warm', 'api_user_detail', url=lambda ctx: reverse('api_user_detail', args=[ctx.user.id])),
+    Route('api_user_detail_jwt', 'api_user_detail', role='jwt',
+          url=lambda ctx: reverse('api_user_detail', args=[ctx.user.id])),
+    Route('api_user_detail_basic', 'api_user_detail', role='basic',
+          url=lambda ctx: reverse('api_user_detail', args=[ctx.user.id])),
+    Route('api_user_batch', 'api_user_batch', role='admin', query={'ids': ','.join(str(pk) for pk in range(1, 101))}),
+    Route('api_user_bulk_update', 'api_user_bulk_update', method='patch', role='admin', content_type='application/json',
+          data=lambda ctx: [{'id': pk, 'phone': '555-0101'} for pk in range(1, 101)], iterations=10),
+    Route('api_user_update', 'api_user_update', method='patch', content_type='application/json',
+          url=lambda ctx: reverse('api_user_update', args=[ctx.user.id]), data=lambda ctx: {'phone': '555-0000'}),
+    Route('api_async_register', 'api_async_register', method='post', role='anon', data=registration_data,
+          content_type='application/json', status=201, iterations=5),
+    Route('api_async_user_list', 'api_async_user_list', query={'page_size': 50}),
+    Route('api_async_user_detail', 'api_async_user_detail',
+          url=lambda ctx: reverse('api_async_user_detail', args=[ctx.user.id])),
+    Route('admin', 'admin:index', role='admin'),
+    Route('schema_json', 'schema-json', role='anon', url=lambda ctx: reverse('schema-json', args=['.json']), iterations=5),
+    Route('schema_swagger_ui', 'schema-swagger-ui', role='anon'),
+    Route('schema_redoc', 'schema-redoc', role='anon'),
+    Route('metrics', 'prometheus-django-metrics', role='anon'),
+]
+
+
+@pytest.fixture(autouse=True)
+def unthrottled(monkeypatch):
+    rates = {scope: '1000000/hour' for scope in SimpleRateThrottle.THROTTLE_RATES}
+    monkeypatch.setattr(SimpleRateThrottle, 'THROTTLE_RATES', rates)
+
+
+@pytest.fixture
+def ctx(db):
+    user = User.objects.create_user(username='benchuser', email='benchuser@example.com', password='benchpass123')
+    admin = User.objects.create_superuser(username='benchadmin', email='benchadmin@example.com', password='benchpass123')
+    return SimpleNamespace(user=user, admin=admin)
+
+
+def percentile(quantiles, p):
+    return quantiles[p - 1] * 1000
+
+
+def measure(client, route, ctx, iterations):
+    latencies = []
+    queries = []
+    for i in range(WARMUP + iterations):
+        if route.prepare:
+            route.prepare(client, ctx)
+        kwargs = {}
+        if route.content_type:
+            kwargs['content_type'] = route.content_type
+        data = route.data(ctx) if route.data else route.query
+        if route.content_type == 'application/json':
+            data = json.dumps(data)
+
+        with CaptureQueriesContext(connection) as captured:
+            start = perf_counter()
+            response = getattr(client, route.method)(route.url(ctx), data, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed = perf_counter() - start
+
+        assert response.status_code == route.status, f'{route.name}: {response.status_code}'
+        if i >= WARMUP:
+            latencies.append(elapsed)
+            queries.append(len(captured))
+    return summarize(latencies, queries, iterations)
+
+
+def summarize(latencies, queries, iterations):
+    quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'p50_ms': percentile(quantiles, 50),
+        'p95_ms': percentile(quantiles, 95),
+        'p99_ms': percentile(quantiles, 99),
+        'max_queries': max(queries),
+        'iterations': iterations,
+    }
+
+
+def record(config, name, result):
+    config._benchmark_results[name] = result
+    if config.getoption('--benchmark-no-thresholds') or config.getoption('--benchmark-update-thresholds'):
+        return
+    threshold = THRESHOLDS[name]
+    assert result['max_queries'] <= threshold['max_queries'], \
+        f"{name}: {result['max_queries']} queries per request, threshold {threshold['max_queries']}"
+    assert result['p95_ms'] <= threshold['p95_ms'] * LATENCY_FACTOR, \
+        f"{name}: p95 {result['p95_ms']:.1f} ms, threshold {threshold['p95_ms'] * LATENCY_FACTOR:.1f} ms"
+
+
+def test_every_route_is_benchmarked():
+    names = {route.url_name for route in ROUTES}
+    for pattern in users.urls.urlpatterns + user_directory.urls.urlpatterns:
+        if isinstance(pattern, URLPattern) and pattern.name:
+            assert pattern.name in names, f'No benchmark for route {pattern.name!r}'
+
+
+@pytest.mark.parametrize('route', ROUTES, ids=[route.name for route in ROUTES])
+def test_route(route, ctx, request):
+    client = Client()
+    if route.role == 'user':
+        client.force_login(ctx.user)
+    elif route.role == 'admin':
+        client.force_login(ctx.admin)
+    elif route.role == 'jwt':
+        token = CustomTokenObtainPairSerializer.get_token(ctx.user).access_token
+        client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    elif route.role == 'basic':
+        credentials = base64.b64encode(f'{ctx.user.username}:benchpass123'.encode()).decode()
+        client.defaults['HTTP_AUTHORIZATION'] = f'Basic {credentials}'
+
+    iterations = route.iterations or request.config.getoption('--benchmark-iterations')
+    result = measure(client, route, ctx, max(iterations, 2))
+    record(request.config, route.name, result)
+
+
+SESSION_BACKENDS = ['db', 'cached_db', 'signed_cookies']
+
+
+@pytest.mark.parametrize('backend', SESSION_BACKENDS)
+def test_session_backend(backend, ctx, settings, request):
+    """Cost of an authenticated page view (user_profile) under each session backend."""
+    settings.SESSION_ENGINE = settings.SESSION_BACKENDS[backend]
+    client = Client()
+    client.force_login(ctx.user)
+
+    iterations = request.config.getoption('--benchmark-iterations')
+    route = Route(f'session_{backend}', 'user_profile')
+    result = measure(client, route, ctx, max(iterations, 2))
+    record(request.config, route.name, result)
+
+
+@pytest.mark.parametrize('hasher', ['pbkdf2', 'argon2', 'scrypt'])
+def test_password_hasher(hasher, ctx, settings, request):
+    """Login throughput per core (the test client is single-threaded) for each PASSWORD_HASHER profile."""
+    if hasher == 'argon2':
+        pytest.importorskip('argon2')
+    settings.PASSWORD_HASHERS = [settings.PASSWORD_HASHER_PROFILES[hasher]]
+    ctx.user.set_password('benchpass123')
+    ctx.user.save()
+
+    iterations = request.config.getoption('--benchmark-iterations')
+    route = next(route for route in ROUTES if route.name == 'login_post')
+    result = measure(Client(), route, ctx, max(min(iterations, 10), 2))
+    result['logins_per_sec'] = 1000 / result['p50_ms']
+    record(request.config, f'login_{hasher}', result)
+
+
+@pytest.mark.parametrize('path', ['serializer', 'values'])
+def test_list_serialization(path, ctx, request):
+    """Building a 200-row list page: UserSerializer over instances vs the values() path of SparseFieldsMixin."""
+    queryset = User.objects.order_by('id')[:200]
+    if path == 'serializer':
+        build = lambda: UserSerializer(queryset.all(), many=True).data  # noqa: E731
+    else:
+        build = lambda: list(queryset.values(*UserSerializer.Meta.fields))  # noqa: E731
+
+    iterations = max(request.config.getoption('--benchmark-iterations'), 2)
+    latencies, queries = [], []
+    for i in range(WARMUP + iterations):
+        with CaptureQueriesContext(connection) as captured:
+            start = perf_counter()
+            build()
+            elapsed = perf_counter() - start
+        if i >= WARMUP:
+            latencies.append(elapsed)
+            queries.append(len(captured))
+    record(request.config, f'serialize_{path}', summarize(latencies, queries, iterations))
+
+
+RENDERERS = {'stdlib': JSONRenderer, 'orjson': ORJSONRenderer}
+
+
+@pytest.mark.parametrize('renderer', RENDERERS)
+def test_json_renderer(renderer, ctx, request):
+    """Rendering a 1000-user list response: throughput and CPU time per response for each API_JSON_BACKEND."""
+    data = UserSerializer(User.objects.order_by('id')[:1000], many=True).data
+    render = RENDERERS[renderer]().render
+
+    iterations = max(request.config.getoption('--benchmark-iterations'), 2)
+    latencies, cpu = [], []
+    for i in range(WARMUP + iterations):
+        start, start_cpu = perf_counter(), process_time()
+        body = render(data, 'application/json')
+        elapsed, elapsed_cpu = perf_counter() - start, process_time() - start_cpu
+        if i >= WARMUP:
+            latencies.append(elapsed)
+            cpu.append(elapsed_cpu)
+
+    result = summarize(latencies, [0], iterations)
+    result['bytes_per_sec'] = len(body) * len(latencies) / sum(latencies)
+    result['cpu_ms'] = statistics.mean(cpu) * 1000
+    record(request.config, f'render_{renderer}', result)
+
+
+CONNECTION_MODES = {'new': 0, 'persistent': 60, 'pool': 0}
+
+
+@pytest.mark.parametrize('mode', CONNECTION_MODES)
+def test_connection_setup(mode, db, request):
+    """
+    One query per request under each connection strategy: a new connection per request
+    (CONN_MAX_AGE=0), a persistent one with health checks, and DB_POOL. Each iteration
+    runs the close_old_connections() calls Django makes on request_started/finished.
+    """
+    settings_dict = {**connection.settings_dict, 'CONN_MAX_AGE': CONNECTION_MODES[mode], 'CONN_HEALTH_CHECKS': True}
+    if mode == 'pool':
+        if connection.vendor != 'postgresql':
+            pytest.skip('users.db_pool is a PostgreSQL backend')
+        from users.db_pool.base import DatabaseWrapper
+        settings_dict['OPTIONS'] = {**settings_dict['OPTIONS'], 'pool': {'max_size': 1}}
+        wrapper = DatabaseWrapper(settings_dict, alias='benchmark')
+    else:
+        wrapper = connections.create_connection(connection.alias)
+        wrapper.settings_dict = settings_dict
+
+    iterations = max(request.config.getoption('--benchmark-iterations'), 2)
+    latencies = []
+    try:
+        for i in range(WARMUP + iterations):
+            start = perf_counter()
+            wrapper.close_if_unusable_or_obsolete()
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            wrapper.close_if_unusable_or_obsolete()
+            elapsed = perf_counter() - start
+            if i >= WARMUP:
+                latencies.append(elapsed)
+    finally:
+        wrapper.close()
+        if mode == 'pool':
+            wrapper.pool.close()
+    record(request.config, f'db_connection_{mode}', summarize(latencies, [1], iterations))
@@ -1,5 +1,6 @@
 import os
 import django
+import pytest
 from django.conf import settings
 
 # We manually designate which settings we will be using in an environment variable
@@ -23,3 +24,11 @@ def pytest_sessionstart(session):
 def pytest_collection_modifyitems(items):
     """Ensure Django is set up before any tests are run."""
     django.setup()
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Cached payloads, versions and throttle history must not leak between tests."""
+    from django.core.cache import cache
+    cache.clear()
+    yield
+    cache.clear()
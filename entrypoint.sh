@@ -4,6 +4,10 @@
 echo "Apply database migrations"
 python manage.py migrate
 
+# Prebuild the OpenAPI schema served at /swagger.json
+echo "Building OpenAPI schema"
+python manage.py build_openapi_schema
+
 # Create superuser
 echo "Creating superuser"
 python manage.py create_admin
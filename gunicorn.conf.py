@@ -0,0 +1,108 @@
+"""
+Gunicorn configuration: ``gunicorn -c gunicorn.conf.py``
+
+Every value can be overridden from the environment (see .env.sample). The
+app is imported once in the master (``preload_app``) and the URLconf, views
+and DRF are imported before forking, so workers share that memory
+copy-on-write instead of each importing it again. Workers are recycled after
+``max_requests`` plus a random jitter, so they do not all restart at once.
+Prometheus metrics are written to ``PROMETHEUS_MULTIPROC_DIR`` and /metrics
+reports the sum over all workers.
+"""
+import gc
+import os
+import tempfile
+
+
+def env_int(name, default):
+    value = os.environ.get(name, '').strip()
+    return int(value) if value else default
+
+
+def env_bool(name, default):
+    value = os.environ.get(name, '').strip().lower()
+    return value in ('1', 'true', 'yes', 'on') if value else default
+
+
+def available_cpus():
+    # CPUs this container may run on, not the host's CPU count
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+cores = available_cpus()
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'uvicorn.workers.UvicornWorker')
+asgi = worker_class.startswith('uvicorn.')
+wsgi_app = 'user_directory.asgi:application' if asgi else 'user_directory.wsgi:application'
+
+# Uvicorn workers serve requests concurrently on their event loop (sync views run in
+# per-request threads), so threads only apply to the gthread worker class.
+threads = env_int('GUNICORN_THREADS', 1 if asgi else 4)
+workers = env_int('GUNICORN_WORKERS', cores * 2 + 1 if threads == 1 else cores + 1)
+
+preload_app = env_bool('GUNICORN_PRELOAD', True)
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10)
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+
+# The worker heartbeat file is touched every few seconds; on a disk-backed /tmp
+# that can block workers on slow I/O
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Must be set before prometheus_client is first imported, here and in the app
+multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR') or os.path.join(
+    worker_tmp_dir or tempfile.gettempdir(), 'prometheus_multiproc',
+)
+os.environ['PROMETHEUS_MULTIPROC_DIR'] = multiproc_dir
+os.makedirs(multiproc_dir, exist_ok=True)
+
+from prometheus_client import Gauge, multiprocess  # noqa: E402
+
+
+def on_starting(server):
+    # Samples of a previous run would otherwise be added to this one's. The
+    # master's own files, written while preloading the app, are kept.
+    own_suffix = f'_{os.getpid()}.db'
+    for name in os.listdir(multiproc_dir):
+        if not name.endswith(own_suffix):
+            os.remove(os.path.join(multiproc_dir, name))
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    # Django only imports the URLconf on the first request; do it before forking
+    from django.core.cache import close_caches
+    from django.db import connections
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+    # Nothing may be inherited half-used by the workers
+    connections.close_all()
+    close_caches()
+    # Keep the collector from touching (and so copying) every preloaded object in each worker
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Created per worker, so the master does not report a sample of its own
+    Gauge(
+        'gunicorn_worker_start_time_seconds',
+        'Start time of each live gunicorn worker',
+        multiprocess_mode='liveall',
+    ).set_to_current_time()
+    Gauge(
+        'gunicorn_worker_max_requests',
+        'Requests after which each live gunicorn worker is recycled, jitter included',
+        multiprocess_mode='liveall',
+    ).set(worker.max_requests)
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
@@ -57,6 +57,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django_prometheus.middleware.PrometheusBeforeMiddleware',
+    'users.middleware.QueryInstrumentationMiddleware',
+    'users.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,6 +82,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'users.context_processors.color_seed',
             ],
         },
     },
@@ -91,16 +94,127 @@ WSGI_APPLICATION = 'user_directory.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# DB_POOL returns connections to a pool of at most DB_POOL_MAX_SIZE connections per
+# worker process at the end of every request; pooled connections are not pinged, but
+# dropped once idle for DB_POOL_MAX_IDLE seconds. Without the pool, connections stay
+# open for CONN_MAX_AGE seconds and are pinged before their first use in each request.
+# Persistent connections do not work under ASGI (the default Uvicorn workers, see
+# gunicorn.conf.py): each request's sync code runs in a new thread, which never sees
+# the previous request's connection. There the pool is the default, and without it
+# connections are closed after every request.
+ASGI_WORKERS = (env('GUNICORN_WORKER_CLASS', default='') or 'uvicorn.workers.UvicornWorker').startswith('uvicorn.')
+DB_POOL = env.bool('DB_POOL') if env('DB_POOL', default='') else ASGI_WORKERS
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'users.db_pool' if DB_POOL else 'django.db.backends.postgresql',
         'NAME': os.environ.get('DB_NAME', 'postgres'),
         'USER': os.environ.get('DB_USER', 'postgres'),
         'PASSWORD': os.environ.get('DB_PASSWORD', 'postgrespassword'),
         'HOST': os.environ.get('DB_HOST', 'db'),
         'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL or ASGI_WORKERS else env.int('CONN_MAX_AGE', default=60),
+        'CONN_HEALTH_CHECKS': env.bool('CONN_HEALTH_CHECKS', default=True),
+        'OPTIONS': {
+            'pool': {
+                'max_size': env.int('DB_POOL_MAX_SIZE', default=10),
+                'timeout': env.float('DB_POOL_TIMEOUT', default=10.0),
+                'max_idle': env.float('DB_POOL_MAX_IDLE', default=600.0),
+            },
+        } if DB_POOL else {},
+    }
+}
+
+# Read replicas: comma-separated host or host:port entries serving copies of the
+# primary. List and detail views read users from them (see users/routers.py);
+# after a write the client reads from the primary for REPLICA_PIN_SECONDS.
+replica_hosts = [host.strip() for host in env.list('DB_REPLICA_HOSTS', default=[]) if host.strip()]
+for index, replica_host in enumerate(replica_hosts, start=1):
+    replica_hostname, _, replica_port = replica_host.partition(':')
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': replica_hostname,
+        'PORT': replica_port or DATABASES['default']['PORT'],
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['users.routers.ReplicaRouter']
+REPLICA_PIN_COOKIE = 'primary_pin'
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=10)
+
+# Cache
+# locmem is per process; point CACHE_URL at Redis (e.g. redis://redis:6379/1) to share
+# cached user payloads and invalidations across gunicorn workers.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Optional separate cache tier for sessions (e.g. redis://redis:6379/2)
+if env('SESSION_CACHE_URL', default=''):
+    CACHES['sessions'] = env.cache('SESSION_CACHE_URL')
+
+# Throttle counters (e.g. redis://redis:6379/3); limits only hold across workers
+# when this, or the default cache, is shared
+if env('THROTTLE_CACHE_URL', default=''):
+    CACHES['throttle'] = env.cache('THROTTLE_CACHE_URL')
+THROTTLE_CACHE_ALIAS = 'throttle' if 'throttle' in CACHES else 'default'
+
+# Version counters of the user caches (users/cache.py) are kept without expiry and
+# must not be evicted; point VERSION_CACHE_URL at a Redis database with
+# maxmemory-policy noeviction. With the default locmem cache they get a store of
+# their own that is not culled at the default cache's 300 entries.
+if env('VERSION_CACHE_URL', default=''):
+    CACHES['versions'] = env.cache('VERSION_CACHE_URL')
+elif CACHES['default']['BACKEND'].endswith('LocMemCache'):
+    CACHES['versions'] = {
+        'BACKEND': CACHES['default']['BACKEND'],
+        'LOCATION': 'user-versions',
+        'OPTIONS': {'MAX_ENTRIES': 1000000},
     }
+USER_VERSION_CACHE_ALIAS = 'versions' if 'versions' in CACHES else 'default'
+
+# Seconds a serialized user (detail) or list page stays cached
+USER_CACHE_TIMEOUT = env.int('USER_CACHE_TIMEOUT', default=300)
+
+# Seconds a verified Basic auth credential skips the password hash check
+BASIC_AUTH_CACHE_TIMEOUT = env.int('BASIC_AUTH_CACHE_TIMEOUT', default=60)
+
+# Sessions
+# cached_db reads sessions from the cache and only falls back to the database on a
+# miss; signed_cookies keeps them client-side and needs no storage at all.
+SESSION_BACKENDS = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_BACKENDS[env('SESSION_BACKEND', default='cached_db')]
+SESSION_CACHE_ALIAS = 'sessions' if 'sessions' in CACHES else 'default'
+
+# Requests running more SQL queries than this are logged as possible N+1 patterns
+QUERY_COUNT_WARNING_THRESHOLD = env.int('QUERY_COUNT_WARNING_THRESHOLD', default=20)
+
+# Password hashing. PASSWORD_HASHER hashes new passwords; the other hashers stay
+# listed so existing hashes still verify and are upgraded after the next login.
+PASSWORD_HASHER_PROFILES = {
+    'pbkdf2': 'users.hashers.TunedPBKDF2PasswordHasher',
+    'argon2': 'users.hashers.TunedArgon2PasswordHasher',
+    'scrypt': 'users.hashers.TunedScryptPasswordHasher',
 }
+PASSWORD_HASHER = env('PASSWORD_HASHER', default='pbkdf2')
+PASSWORD_HASHERS = [PASSWORD_HASHER_PROFILES[PASSWORD_HASHER]] + [
+    hasher for name, hasher in PASSWORD_HASHER_PROFILES.items() if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+PASSWORD_PBKDF2_ITERATIONS = env.int('PASSWORD_PBKDF2_ITERATIONS', default=600000)
+PASSWORD_ARGON2_TIME_COST = env.int('PASSWORD_ARGON2_TIME_COST', default=2)
+PASSWORD_ARGON2_MEMORY_COST = env.int('PASSWORD_ARGON2_MEMORY_COST', default=102400)  # KiB
+PASSWORD_ARGON2_PARALLELISM = env.int('PASSWORD_ARGON2_PARALLELISM', default=8)
+PASSWORD_SCRYPT_WORK_FACTOR = env.int('PASSWORD_SCRYPT_WORK_FACTOR', default=2 ** 14)
+# Threads per process rehashing outdated passwords after login (0 rehashes inline)
+PASSWORD_REHASH_WORKERS = env.int('PASSWORD_REHASH_WORKERS', default=2)
+# Rehashes waiting for one of those threads; more are dropped until a later login
+PASSWORD_REHASH_QUEUE_SIZE = env.int('PASSWORD_REHASH_QUEUE_SIZE', default=100)
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -149,25 +263,68 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'users.CustomUser'
 
 # Add these settings at the end of the file
+# API authenticators, tried in API_AUTHENTICATION_ORDER. Token-only deployments can
+# put jwt first so Bearer requests skip session and Basic parsing; note that the
+# first authenticator also decides whether unauthenticated requests get 401 or 403.
+API_AUTHENTICATORS = {
+    'session': 'rest_framework.authentication.SessionAuthentication',
+    'basic': 'users.authentication.CachedBasicAuthentication',
+    'jwt': 'users.authentication.StatelessJWTAuthentication',
+}
+
+# JSON rendering and parsing for the API: stdlib json (the default), or orjson
+# (several times faster on large user lists). orjson writes NaN/Infinity as null
+# where the stdlib renderer raises; see users/renderers.py.
+API_JSON_BACKENDS = {
+    'stdlib': ('rest_framework.renderers.JSONRenderer', 'rest_framework.parsers.JSONParser'),
+    'orjson': ('users.renderers.ORJSONRenderer', 'users.renderers.ORJSONParser'),
+}
+API_JSON_RENDERER, API_JSON_PARSER = API_JSON_BACKENDS[env('API_JSON_BACKEND', default='stdlib')]
+
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    ),
+    'DEFAULT_RENDERER_CLASSES': [
+        API_JSON_RENDERER,
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        API_JSON_PARSER,
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        API_AUTHENTICATORS[name] for name in env.list('API_AUTHENTICATION_ORDER', default=['session', 'basic', 'jwt'])
+    ],
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'users.throttling.SlidingWindowAnonRateThrottle',
+        'users.throttling.SlidingWindowUserRateThrottle'
     ],
     'DEFAULT_THROTTLE_RATES': {
         'anon': '5/hour',
-        'user': '100/day'
-    }
+        'user': '100/day',
+        # Per-endpoint scopes (SlidingWindowScopedRateThrottle + throttle_scope on the view)
+        'register': env('THROTTLE_RATE_REGISTER', default='5/hour'),
+        'login': env('THROTTLE_RATE_LOGIN', default='5/hour'),
+        'user_update': env('THROTTLE_RATE_USER_UPDATE', default='100/day'),
+    },
+    'DEFAULT_PAGINATION_CLASS': 'users.pagination.UserCursorPagination',
+    'PAGE_SIZE': env.int('API_PAGE_SIZE', default=50),
+    'MAX_PAGE_SIZE': env.int('API_MAX_PAGE_SIZE', default=200),
 }
 
+# Bulk user import (manage.py import_users and /api/users/import/)
+USER_IMPORT_BATCH_SIZE = env.int('USER_IMPORT_BATCH_SIZE', default=1000)
+# Hashing processes per import. Kept small: /api/users/import/ starts them inside a
+# web worker, and every gunicorn worker may run an import at the same time.
+USER_IMPORT_WORKERS = env.int('USER_IMPORT_WORKERS', default=2)
+
+# Most IDs accepted by one /api/users/batch/ request
+USER_BATCH_MAX_IDS = env.int('USER_BATCH_MAX_IDS', default=100)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    # Read requests authenticate from the token claims without loading the user row
+    'TOKEN_USER_CLASS': 'users.authentication.ClaimsUser',
 }
 
 HANDLER400 = 'users.views.bad_request'
@@ -179,6 +336,11 @@ LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/users/'
 
 # Logging configuration
+# Loggers only enqueue records; a QueueListener thread writes them to the console and
+# files in batches (users/log_handlers.py). LOG_FORMAT=json writes one JSON object per line.
+LOG_FORMAT = env('LOG_FORMAT', default='text')
+LOG_QUEUE_SIZE = env.int('LOG_QUEUE_SIZE', default=10000)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -191,42 +353,53 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'users.log_handlers.JSONFormatter',
+        },
     },
     'handlers': {
         'file': {
             'level': 'DEBUG',
-            'class': 'logging.handlers.RotatingFileHandler',
+            'class': 'users.log_handlers.BatchedRotatingFileHandler',
             'filename': os.path.join(BASE_DIR, 'logs', 'debug.log'),
             'maxBytes': 1024 * 1024 * 5,  # 5 MB
             'backupCount': 5,
-            'formatter': 'verbose',
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'verbose',
         },
         'error_file': {
             'level': 'ERROR',
-            'class': 'logging.handlers.RotatingFileHandler',
+            'class': 'users.log_handlers.BatchedRotatingFileHandler',
             'filename': os.path.join(BASE_DIR, 'logs', 'error.log'),
             'maxBytes': 1024 * 1024 * 5,  # 5 MB
             'backupCount': 5,
-            'formatter': 'verbose',
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'verbose',
         },
         'console': {
             'level': 'INFO',
             'class': 'logging.StreamHandler',
-            'formatter': 'simple',
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'simple',
+        },
+        'queue': {
+            '()': 'users.log_handlers.QueuedHandler',
+            # Configured after these: dictConfig sets handlers up in name order
+            'targets': ['cfg://handlers.console', 'cfg://handlers.file', 'cfg://handlers.error_file'],
+            'maxsize': LOG_QUEUE_SIZE,
+            # Below ERROR, records are dropped (and counted) rather than slowing requests down
+            'block_level': 'ERROR',
         },
     },
     'root': {
-        'handlers': ['console', 'file', 'error_file'],
+        'handlers': ['queue'],
         'level': 'INFO',
     },
     'loggers': {
         'django': {
-            'handlers': ['console', 'file', 'error_file'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': False,
         },
         'user_directory': {
-            'handlers': ['console', 'file', 'error_file'],
+            'handlers': ['queue'],
             'level': 'DEBUG',
             'propagate': False,
         },
@@ -244,7 +417,15 @@ SWAGGER_SETTINGS = {
         }
     },
     'SECURITY_REQUIREMENTS': [{'Bearer': []}],
+    # The UIs load the prebuilt schema (see users/schema.py)
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
+}
+REDOC_SETTINGS = {
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
 }
+# Written by `manage.py build_openapi_schema` at deploy time
+OPENAPI_SCHEMA_DIR = env('OPENAPI_SCHEMA_DIR', default='').strip() or str(BASE_DIR / 'openapi')
+OPENAPI_SCHEMA_MAX_AGE = env.int('OPENAPI_SCHEMA_MAX_AGE', default=86400)
 
 CSRF_TRUSTED_ORIGINS = ['https://paragoni.space']
 
@@ -18,30 +18,15 @@ from django.contrib import admin
 from django.urls import path, include, re_path
 from users.views import HomePageView, bad_request, permission_denied, page_not_found, server_error
 from django.conf.urls import handler400, handler403, handler404, handler500
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-   openapi.Info(
-      title="User Directory API",
-      default_version='v1',
-      description="API documentation for User Directory",
-      terms_of_service="https://www.google.com/policies/terms/",
-      contact=openapi.Contact(email="contact@snippets.local"),
-      license=openapi.License(name="BSD License"),
-   ),
-   public=True,
-   permission_classes=(permissions.AllowAny,),
-)
+from users import schema
 
 urlpatterns = [
     path('', HomePageView.as_view(), name='home'),
     path('admin/', admin.site.urls),
     path('', include('users.urls')),
-    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema.schema_document, name='schema-json'),
+    path('swagger/', schema.swagger_ui, name='schema-swagger-ui'),
+    path('redoc/', schema.redoc, name='schema-redoc'),
     path('', include('django_prometheus.urls')),
 ]
 
@@ -0,0 +1,179 @@
+"""
+Async-native versions of the read-heavy API endpoints.
+
+These are plain Django async views (DRF 3.14 has no async support) served under
+``/api/async/``. Database access goes through the async ORM, so under an ASGI
+server a request waiting on PostgreSQL or on a slow client does not hold a
+worker thread. Authentication, permissions and throttling reuse the DRF
+classes and run in one ``sync_to_async`` hop, with the same 401/403 responses
+as the DRF views; so do object permissions and the registration serializer.
+"""
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .cache import user_from_payload
+from .filters import UserSearchFilter
+from .pagination import UserCursorPagination
+from .permissions import CanViewProfile, IsAuthenticatedWithUnauthorizedResponse
+from .serializers import UserRegistrationSerializer, UserSerializer
+from .throttling import SlidingWindowScopedRateThrottle
+
+User = get_user_model()
+
+logger = logging.getLogger(__name__)
+
+USER_FIELDS = UserSerializer.Meta.fields
+
+
+def _error(detail, status):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def _drf_request(request, view):
+    return Request(request, authenticators=[auth() for auth in view.authentication_classes])
+
+
+def _authentication_error(drf_request, exc):
+    """Like APIView.handle_exception(): 401 with the first authenticator's challenge, else 403."""
+    authenticators = drf_request.authenticators
+    header = authenticators[0].authenticate_header(drf_request) if authenticators else None
+    response = _error(exc.detail, 401 if header else 403)
+    if header:
+        response['WWW-Authenticate'] = header
+    return response
+
+
+def _initial(request, view):
+    """Authenticate, check permissions and throttle like APIView.initial(); returns (user, error response or None)."""
+    drf_request = _drf_request(request, view)
+    try:
+        user = drf_request.user
+        for permission in [permission_class() for permission_class in view.permission_classes]:
+            if permission.has_permission(drf_request, view):
+                continue
+            if drf_request.authenticators and not drf_request.successful_authenticator:
+                raise NotAuthenticated()
+            raise PermissionDenied(getattr(permission, 'message', None))
+    except (AuthenticationFailed, NotAuthenticated) as exc:
+        return None, _authentication_error(drf_request, exc)
+    except PermissionDenied as exc:
+        return None, _error(exc.detail, exc.status_code)
+    for throttle_class in view.throttle_classes:
+        if not throttle_class().allow_request(drf_request, view):
+            return None, _error('Request was throttled.', 429)
+    return user, None
+
+
+def _register(serializer):
+    """Validate and create in one sync_to_async hop; None when the data is invalid."""
+    if not serializer.is_valid():
+        return None
+    return serializer.save()
+
+
+class AsyncAPIView(View):
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    permission_classes = []
+
+    async def initial(self, request):
+        return await sync_to_async(_initial)(request, self)
+
+    def check_object_permissions(self, request, obj):
+        """APIView.check_object_permissions(); ``request.user`` is the user DRF authenticated."""
+        for permission in [permission_class() for permission_class in self.permission_classes]:
+            if not permission.has_object_permission(request, self, obj):
+                raise PermissionDenied(getattr(permission, 'message', None))
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token/Basic clients, like the DRF views
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+
+class AsyncUserListView(AsyncAPIView):
+    """Keyset pages of users: ``?after=<id>&page_size=<n>`` plus the usual list filters."""
+
+    permission_classes = [IsAuthenticatedWithUnauthorizedResponse]
+
+    async def get(self, request):
+        user, error = await self.initial(request)
+        if error is not None:
+            return error
+
+        pagination = UserCursorPagination()
+        try:
+            page_size = min(int(request.GET.get('page_size', pagination.page_size)), pagination.max_page_size)
+            after = int(request.GET.get('after', 0))
+        except ValueError:
+            return _error('page_size and after must be integers.', 400)
+        if page_size < 1:
+            return _error('page_size must be positive.', 400)
+
+        queryset = UserSearchFilter().filter_queryset(Request(request), User.objects.all(), self)
+        queryset = queryset.filter(id__gt=after).order_by('id').values(*USER_FIELDS)[:page_size]
+        results = [row async for row in queryset.aiterator(chunk_size=page_size)]
+
+        next_url = None
+        if len(results) == page_size:
+            params = request.GET.copy()
+            params['after'] = results[-1]['id']
+            next_url = request.build_absolute_uri('?' + params.urlencode())
+        logger.info("Async user list accessed by %s", user.username)
+        return JsonResponse({'next': next_url, 'results': results})
+
+
+class AsyncUserDetailView(AsyncAPIView):
+    permission_classes = [IsAuthenticated, CanViewProfile]
+
+    async def get(self, request, pk):
+        user, error = await self.initial(request)
+        if error is not None:
+            return error
+        try:
+            data = await User.objects.values(*USER_FIELDS).aget(pk=pk)
+        except User.DoesNotExist:
+            return _error('Not found.', 404)
+        try:
+            await sync_to_async(self.check_object_permissions)(request, user_from_payload(data))
+        except PermissionDenied as exc:
+            return _error(exc.detail, exc.status_code)
+        logger.info("Async user detail accessed for user ID %s by %s", pk, user.username)
+        return JsonResponse(data)
+
+
+class AsyncUserRegistrationView(AsyncAPIView):
+    throttle_classes = [SlidingWindowScopedRateThrottle]
+    throttle_scope = 'register'
+
+    async def post(self, request):
+        _, error = await self.initial(request)
+        if error is not None:
+            return error
+
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body)
+            except ValueError:
+                return _error('Malformed JSON.', 400)
+        else:
+            data = request.POST
+
+        serializer = UserRegistrationSerializer(data=data)
+        user = await sync_to_async(_register)(serializer)
+        if user is None:
+            logger.warning("Async user registration failed: %s", serializer.errors)
+            return JsonResponse(serializer.errors, status=400)
+        logger.info("New user registered (async): %s", user.username)
+        return JsonResponse(UserSerializer(user).data, status=201)
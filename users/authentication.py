@@ -0,0 +1,123 @@
+"""
+API authentication classes that avoid repeated work per request.
+
+``CachedBasicAuthentication`` remembers verified Basic credentials for
+``BASIC_AUTH_CACHE_TIMEOUT`` seconds, so integration scripts pay for the
+password hash check once instead of on every call.
+
+Access tokens issued by ``CustomTokenObtainPairSerializer`` carry ``user_id``,
+``username``, ``email`` and ``is_staff``. For safe (read) methods
+``StatelessJWTAuthentication`` builds a ``ClaimsUser`` from those verified
+claims instead of loading the ``CustomUser`` row; anything not covered by the
+claims is loaded from the database on first access. Unsafe methods always load
+the full user, so a deactivated account cannot write with a token that has not
+expired yet.
+"""
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import cache_credentials, get_cached_credentials, invalidate_credentials, password_fingerprint
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    def authenticate_credentials(self, userid, password, request=None):
+        entry = get_cached_credentials(userid, password)
+        if entry is not None:
+            user = get_user_model()._default_manager.filter(pk=entry['pk']).first()
+            if user is not None and user.is_active and entry['password'] == password_fingerprint(user):
+                return user, None
+            invalidate_credentials(userid, password)
+
+        user, auth = super().authenticate_credentials(userid, password, request)
+        cache_credentials(userid, password, user)
+        return user, auth
+
+
+def _claim_or_field(name):
+    """The claim when the token carries it, else the field of the real row."""
+    def value(self):
+        if name in self.token:
+            return self.token[name]
+        return getattr(self.instance, name)
+    return cached_property(value)
+
+
+class ClaimsUser(TokenUser):
+    """A user backed by token claims that loads the real row only when needed."""
+
+    # TokenUser defines these with fixed defaults, which would hide the row's
+    # values from __getattr__
+    username = _claim_or_field('username')
+    is_active = _claim_or_field('is_active')
+    is_staff = _claim_or_field('is_staff')
+    is_superuser = _claim_or_field('is_superuser')
+
+    @property
+    def groups(self):
+        return self.instance.groups
+
+    @property
+    def user_permissions(self):
+        return self.instance.user_permissions
+
+    def get_group_permissions(self, obj=None):
+        return self.instance.get_group_permissions(obj)
+
+    def get_all_permissions(self, obj=None):
+        return self.instance.get_all_permissions(obj)
+
+    def has_perm(self, perm, obj=None):
+        return self.instance.has_perm(perm, obj)
+
+    def has_perms(self, perm_list, obj=None):
+        return self.instance.has_perms(perm_list, obj)
+
+    def has_module_perms(self, module):
+        return self.instance.has_module_perms(module)
+
+    def __eq__(self, other):
+        # Compare against model instances too, e.g. ``obj == request.user`` in permissions
+        if isinstance(other, (TokenUser, get_user_model())):
+            return self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    @cached_property
+    def instance(self):
+        return get_user_model().objects.get(**{api_settings.USER_ID_FIELD: self.id})
+
+    def __getattr__(self, attr):
+        if attr.startswith('_') or attr == 'token':
+            raise AttributeError(attr)
+        if attr in self.token:
+            return self.token[attr]
+        return getattr(self.instance, attr)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        if request.method in SAFE_METHODS:
+            return self.get_token_user(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    def get_token_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        return api_settings.TOKEN_USER_CLASS(validated_token)
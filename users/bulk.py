@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate_users
+from .importer import _chunked
+from .serializers import UserBulkUpdateSerializer
+
+User = get_user_model()
+
+
+def bulk_update_users(items, batch_size=1000):
+    """
+    Apply a list of partial ``UserSerializer`` payloads, each carrying an ``id``.
+
+    Everything runs in one transaction: users are loaded and locked with one
+    ``in_bulk`` query per chunk and every valid item is written with
+    ``bulk_update``. That neither sends ``post_save`` nor bumps ``auto_now``
+    fields, so ``updated_at`` is set explicitly and the cache is invalidated
+    here. New usernames are checked with one query, and clashes within the
+    request are reported per item. Returns one result per item, in request
+    order; raises ``IntegrityError`` if a concurrent write still causes a
+    clash, after rolling everything back.
+    """
+    results = [None] * len(items)
+    ids = {}
+    for index, item in enumerate(items):
+        pk = item.get('id') if isinstance(item, dict) else None
+        if not isinstance(pk, int) or isinstance(pk, bool):
+            results[index] = {'id': pk, 'status': 'invalid', 'errors': {'id': ['An integer id is required.']}}
+        elif pk in ids:
+            results[index] = {'id': pk, 'status': 'invalid', 'errors': {'id': ['Duplicate id in this request.']}}
+        else:
+            ids[pk] = index
+
+    now = timezone.now()
+    changed, fields = [], {'updated_at'}
+    with transaction.atomic():
+        updates = []
+        for chunk in _chunked(ids.items(), batch_size):
+            users = User.objects.select_for_update().in_bulk([pk for pk, _ in chunk])
+            for pk, index in chunk:
+                user = users.get(pk)
+                if user is None:
+                    results[index] = {'id': pk, 'status': 'not_found'}
+                    continue
+                data = {key: value for key, value in items[index].items() if key != 'id'}
+                serializer = UserBulkUpdateSerializer(user, data=data, partial=True)
+                if not serializer.is_valid():
+                    results[index] = {'id': pk, 'status': 'invalid', 'errors': serializer.errors}
+                    continue
+                updates.append((index, user, serializer.validated_data))
+
+        for index, user, data in _check_usernames(updates, results):
+            for field, value in data.items():
+                setattr(user, field, value)
+                fields.add(field)
+            user.updated_at = now
+            changed.append(user)
+            results[index] = {'id': user.pk, 'status': 'updated'}
+        if changed:
+            # Still possible if a concurrent write took a username after the check;
+            # the whole request is rolled back and the caller reports a conflict
+            User.objects.bulk_update(changed, sorted(fields), batch_size=batch_size)
+
+    if changed:
+        invalidate_users(user.pk for user in changed)
+    return {'updated': len(changed), 'failed': len(items) - len(changed), 'results': results}
+
+
+def _check_usernames(updates, results):
+    """
+    Drop updates whose new username is taken by another user or by an earlier
+    item, with one query for the whole request instead of one per item.
+    """
+    usernames = [data['username'] for _, user, data in updates if 'username' in data]
+    owners = dict(User.objects.filter(username__in=usernames).values_list('username', 'pk'))
+    claimed = {}
+    valid = []
+    for index, user, data in updates:
+        username = data.get('username')
+        if username is None:
+            valid.append((index, user, data))
+        elif owners.get(username, user.pk) != user.pk:
+            results[index] = _username_error(user, 'A user with that username already exists.')
+        elif claimed.setdefault(username, user.pk) != user.pk:
+            results[index] = _username_error(user, 'Duplicate username in this request.')
+        else:
+            valid.append((index, user, data))
+    return valid
+
+
+def _username_error(user, message):
+    return {'id': user.pk, 'status': 'invalid', 'errors': {'username': [message]}}
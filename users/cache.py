@@ -0,0 +1,287 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils.crypto import salted_hmac
+from django.db.models import Count, Max
+from prometheus_client import Counter
+from rest_framework.response import Response
+
+from .conditional import check_preconditions, list_etag, set_validators, user_etag
+from .fieldsets import SparseFieldsMixin
+from .filters import UserSearchFilter
+from .pagination import UserCursorPagination
+from .routers import read_from_replica
+from .serializers import UserSerializer
+
+User = get_user_model()
+
+CACHED_FIELDS = set(UserSerializer.Meta.fields)
+
+cache_requests = Counter(
+    'user_directory_cache_requests_total',
+    'User payload cache lookups',
+    ['kind', 'result'],
+)
+
+# Every key carries a version that is bumped on writes instead of deleting
+# entries, so invalidation is a single atomic incr even for list pages whose
+# keys are not known in advance. Entries under old versions simply expire.
+#
+# Readers take the version before they query and store under that version, so
+# a write that lands in between leaves their entry under a version nobody asks
+# for any more. Writers bump only once their transaction has committed.
+#
+# The counters live in their own cache (USER_VERSION_CACHE_ALIAS) without
+# expiry. Should one be lost anyway, it restarts from the clock rather than
+# from 1, so entries stored under its earlier values cannot come back.
+LIST_VERSION_KEY = 'users:list:version'
+
+
+def _versions():
+    return caches[settings.USER_VERSION_CACHE_ALIAS]
+
+
+def _user_version_key(pk):
+    return f'users:{pk}:version'
+
+
+def _get_version(key):
+    versions = _versions()
+    version = versions.get(key)
+    if version is None:
+        initial = time.time_ns()
+        versions.add(key, initial, timeout=None)
+        version = versions.get(key, initial)
+    return version
+
+
+def _bump_version(key):
+    versions = _versions()
+    versions.add(key, time.time_ns(), timeout=None)
+    try:
+        versions.incr(key)
+    except ValueError:
+        # Lost between add() and incr()
+        versions.set(key, time.time_ns(), timeout=None)
+
+
+def get_user_version(pk):
+    return _get_version(_user_version_key(pk))
+
+
+def get_list_version():
+    return _get_version(LIST_VERSION_KEY)
+
+
+# Replicas may lag a write by up to REPLICA_PIN_SECONDS. Within that window a
+# page read from a replica could be older than the version it would be stored
+# under, so such reads are served but not cached.
+RECENT_WRITE_KEY = 'users:recent_write'
+
+
+def may_cache_reads():
+    return not (read_from_replica() and cache.get(RECENT_WRITE_KEY))
+
+
+def _record(kind, value):
+    cache_requests.labels(kind=kind, result='miss' if value is None else 'hit').inc()
+    return value
+
+
+# Entries keep the version stamp next to the payload so conditional requests
+# can be answered from the cache without touching the database.
+
+def get_cached_user(pk, version=None):
+    """Return ``{'data': payload, 'updated_at': datetime}`` or None."""
+    version = version or get_user_version(pk)
+    return _record('detail', cache.get(f'users:detail:{pk}', version=version))
+
+
+def cache_user(pk, data, updated_at, version):
+    """Store what was read under ``version``, taken from get_user_version() before the read."""
+    if not may_cache_reads():
+        return
+    entry = {'data': data, 'updated_at': updated_at}
+    cache.set(f'users:detail:{pk}', entry, settings.USER_CACHE_TIMEOUT, version=version)
+
+
+# List keys are built from the parameters the list views act on, so unrelated
+# or junk query parameters neither split nor grow the cache.
+LIST_QUERY_PARAMS = sorted({
+    UserCursorPagination.cursor_query_param,
+    UserCursorPagination.page_size_query_param,
+    UserCursorPagination.ordering_query_param,
+    SparseFieldsMixin.fields_query_param,
+    UserSearchFilter.search_param,
+    *UserSearchFilter.search_fields,
+})
+
+
+def _list_digest(request, absolute):
+    params = [(name, request.GET.get(name)) for name in LIST_QUERY_PARAMS if request.GET.get(name)]
+    # Pagination links are absolute in API responses
+    origin = f'{request.scheme}://{request.get_host()}' if absolute else ''
+    return hashlib.md5(f'{origin}{request.path}?{params!r}'.encode()).hexdigest()
+
+
+def _list_key(request):
+    return f'users:list:{_list_digest(request, absolute=True)}'
+
+
+def get_cached_list(request, version=None):
+    version = version or get_list_version()
+    return _record('list', cache.get(_list_key(request), version=version))
+
+
+def cache_list(request, data, stamp, version):
+    if not may_cache_reads():
+        return
+    entry = {'data': data, 'stamp': stamp}
+    cache.set(_list_key(request), entry, settings.USER_CACHE_TIMEOUT, version=version)
+
+
+# Rendered HTML list pages differ by role, and for non-admin users by who is
+# looking (the "(You)" marker), on top of the page URL.
+
+def _list_page_key(request, viewer_id):
+    role = 'staff' if viewer_id is None else f'user:{viewer_id}'
+    return f'users:list_page:{role}:{_list_digest(request, absolute=False)}'
+
+
+def get_cached_list_page(request, viewer_id, version=None):
+    version = version or get_list_version()
+    return _record('list_page', cache.get(_list_page_key(request, viewer_id), version=version))
+
+
+def cache_list_page(request, viewer_id, html, version):
+    if not may_cache_reads():
+        return
+    cache.set(_list_page_key(request, viewer_id), html, settings.USER_CACHE_TIMEOUT, version=version)
+
+
+def invalidate_user(pk):
+    transaction.on_commit(lambda: _invalidate([pk]))
+
+
+def invalidate_users(pks):
+    """Invalidate many users at once, e.g. after bulk_update(), with a single list bump."""
+    pks = list(pks)
+    transaction.on_commit(lambda: _invalidate(pks))
+
+
+def invalidate_user_list():
+    transaction.on_commit(lambda: _invalidate([]))
+
+
+def _invalidate(pks):
+    # Run after commit: bumped any earlier, a reader could still load the old
+    # row and store it under the new version
+    for pk in pks:
+        _bump_version(_user_version_key(pk))
+    _bump_version(LIST_VERSION_KEY)
+    if settings.DATABASE_REPLICAS:
+        cache.set(RECENT_WRITE_KEY, True, settings.REPLICA_PIN_SECONDS)
+
+
+# Verified Basic auth credentials are cached under an HMAC of username and
+# password, never the password itself. The entry remembers a fingerprint of the
+# stored password hash, so it stops matching as soon as the password changes
+# (set_password always produces a new salt).
+
+def _credentials_key(username, password):
+    digest = salted_hmac('users.basic_auth', f'{username}:{password}', algorithm='sha256').hexdigest()
+    return f'users:credentials:{digest}'
+
+
+def password_fingerprint(user):
+    return salted_hmac('users.basic_auth.password', user.password, algorithm='sha256').hexdigest()
+
+
+def get_cached_credentials(username, password):
+    """Return ``{'pk': user pk, 'password': fingerprint}`` or None."""
+    return _record('credentials', cache.get(_credentials_key(username, password)))
+
+
+def cache_credentials(username, password, user):
+    entry = {'pk': user.pk, 'password': password_fingerprint(user)}
+    cache.set(_credentials_key(username, password), entry, settings.BASIC_AUTH_CACHE_TIMEOUT)
+
+
+def invalidate_credentials(username, password):
+    cache.delete(_credentials_key(username, password))
+
+
+def user_from_payload(data):
+    """Unsaved instance rebuilt from a cached payload, enough for permission checks and templates."""
+    return User(**data)
+
+
+class CachedRetrieveMixin:
+    """
+    Serve GET from the per-user payload cache, with ETag/Last-Modified validators.
+
+    A cache hit costs no queries; a miss costs the single get_object() query.
+    Object permissions are checked before any 304 is returned. With
+    SparseFieldsMixin only full payloads are cached; narrowed responses are cut
+    from a cached entry or loaded with a narrowed query.
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        fields = self.get_requested_fields() if hasattr(self, 'get_requested_fields') else None
+        version = get_user_version(pk)
+        entry = get_cached_user(pk, version)
+        if entry is None:
+            instance = self.get_object()
+            updated_at = instance.updated_at
+        else:
+            instance = None
+            updated_at = entry['updated_at']
+            self.check_object_permissions(request, user_from_payload(entry['data']))
+
+        etag = user_etag(pk, updated_at, fields)
+        response = check_preconditions(request, etag, updated_at)
+        if response is None:
+            if entry is None:
+                data = self.get_serializer(instance).data
+                if fields is None:
+                    cache_user(pk, data, updated_at, version)
+            elif fields is None:
+                data = entry['data']
+            else:
+                data = {name: entry['data'][name] for name in fields}
+            response = Response(data)
+        return set_validators(response, etag, updated_at)
+
+
+class CachedListMixin:
+    """
+    Serve list GETs (any filter, cursor or page size) from the list page cache.
+
+    The list ETag comes from the row count and latest updated_at of the filtered
+    queryset, so a 304 costs at most that one aggregate query.
+    """
+
+    def list(self, request, *args, **kwargs):
+        version = get_list_version()
+        entry = get_cached_list(request, version)
+        if entry is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            stamp = queryset.aggregate(count=Count('id'), last_modified=Max('updated_at'))
+        else:
+            stamp = entry['stamp']
+
+        etag = list_etag(request, stamp)
+        response = check_preconditions(request, etag, stamp['last_modified'])
+        if response is None:
+            if entry is None:
+                data = super().list(request, *args, **kwargs).data
+                cache_list(request, data, stamp, version)
+            else:
+                data = entry['data']
+            response = Response(data)
+        return set_validators(response, etag, stamp['last_modified'])
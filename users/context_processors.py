@@ -0,0 +1,27 @@
+from functools import partial
+
+from django.utils.crypto import salted_hmac
+
+
+def get_color_seed(request):
+    """
+    Deterministic per-visitor seed for the Memphis palette.
+
+    Derived from the user id, else the existing session key, else the client's
+    address and user agent, so it never needs to be stored and anonymous page
+    views create no session.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        source = f'user:{user.pk}'
+    elif getattr(request, 'session', None) is not None and request.session.session_key:
+        source = f'session:{request.session.session_key}'
+    else:
+        source = f"client:{request.META.get('REMOTE_ADDR', '')}:{request.META.get('HTTP_USER_AGENT', '')}"
+    digest = salted_hmac('users.color_seed', source).hexdigest()
+    return int(digest[:8], 16) % 1000000 + 1
+
+
+def color_seed(request):
+    # Templates call callables, so the seed is only computed when a template renders it
+    return {'color_seed': partial(get_color_seed, request)}
@@ -0,0 +1,15 @@
+"""
+PostgreSQL backend that hands connections back to a per-process pool.
+
+    'ENGINE': 'users.db_pool',
+    'CONN_MAX_AGE': 0,
+    'OPTIONS': {'pool': {'max_size': 10, 'timeout': 10, 'max_idle': 600}},
+
+Django keeps one connection per thread, and under Uvicorn workers each
+request's sync code runs in a new thread, so ``CONN_MAX_AGE`` never reuses a
+connection there. This backend is the default with Uvicorn workers.
+With this backend, closing a connection at the end of a request returns it
+to the pool, and the next request on any thread of the worker checks it out
+again instead of opening a new one. ``max_size`` caps the connections per
+worker process; a request waits up to ``timeout`` seconds for one to free up.
+"""
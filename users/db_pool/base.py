@@ -0,0 +1,46 @@
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from django.utils.asyncio import async_unsafe
+
+from .pool import ConnectionPool, get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop('pool', None)
+        return conn_params
+
+    def get_pool(self, conn_params):
+        options = self.settings_dict['OPTIONS'].get('pool', {})
+        # Keyed by target as well as alias: the test runner points the same alias
+        # at the 'postgres' database first and at the test database afterwards
+        key = (self.alias, *(conn_params.get(name) for name in ('host', 'port', 'dbname', 'user')))
+        return get_pool(key, lambda: ConnectionPool(
+            lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+            alias=self.alias,
+            **options,
+        ))
+
+    def get_new_connection(self, conn_params):
+        # Set by the parent on new connections only; reused ones need it too
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED)
+        )
+        self.pool = self.get_pool(conn_params)
+        return self.pool.getconn()
+
+    @async_unsafe
+    def close(self):
+        self.validate_thread_sharing()
+        connection = self.connection
+        if connection is None or self.closed_in_transaction:
+            return super().close()
+        if not self.in_atomic_block:
+            # Detached first, so that Django's close() leaves it open for the pool
+            self.connection = None
+        try:
+            super().close()
+        finally:
+            # Reused, or discarded if close() had to close it inside a transaction
+            self.pool.putconn(connection)
@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+from collections import deque
+
+from prometheus_client import Gauge, Histogram
+from psycopg2 import OperationalError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+
+POOL_TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+pool_wait = Histogram(
+    'django_db_pool_wait_seconds',
+    'Time spent waiting for a free slot in the connection pool',
+    ['alias'],
+    buckets=POOL_TIME_BUCKETS,
+)
+pool_checkout = Histogram(
+    'django_db_pool_checkout_seconds',
+    'How long a pooled connection stayed checked out',
+    ['alias'],
+    buckets=POOL_TIME_BUCKETS,
+)
+pool_connections = Gauge(
+    'django_db_pool_connections',
+    'Open pooled connections, by state (in_use or idle)',
+    ['alias', 'state'],
+    multiprocess_mode='livesum',
+)
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of at most ``max_size`` connections made by ``connect()``.
+
+    Connections are opened on demand and handed out most recently used first.
+    ``getconn()`` waits up to ``timeout`` seconds for a free slot and then raises
+    ``PoolTimeout``. ``putconn()`` rolls back anything left open and discards
+    connections that are closed or broken instead of returning them. Checking
+    out does not query the server: connections idle for more than ``max_idle``
+    seconds, which the server or a firewall may have dropped, are discarded
+    instead.
+    """
+
+    def __init__(self, connect, alias='default', max_size=10, timeout=10.0, max_idle=600.0):
+        self.connect = connect
+        self.alias = alias
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.lock = threading.Lock()
+        self.idle = deque()
+        self.checked_out = {}
+
+    def getconn(self):
+        start = time.monotonic()
+        acquired = self.slots.acquire(timeout=self.timeout)
+        pool_wait.labels(alias=self.alias).observe(time.monotonic() - start)
+        if not acquired:
+            raise PoolTimeout(
+                f'No connection available in the {self.alias!r} pool after {self.timeout}s '
+                f'({self.max_size} in use)'
+            )
+        try:
+            connection = self._take_idle() or self.connect()
+        except BaseException:
+            self.slots.release()
+            raise
+        with self.lock:
+            self.checked_out[id(connection)] = time.monotonic()
+        self._update_gauge()
+        return connection
+
+    def _take_idle(self):
+        while True:
+            with self.lock:
+                if not self.idle:
+                    return None
+                connection, idle_since = self.idle.pop()
+            if not connection.closed and time.monotonic() - idle_since <= self.max_idle:
+                return connection
+            self._discard(connection)
+
+    def putconn(self, connection):
+        with self.lock:
+            checked_out_at = self.checked_out.pop(id(connection), None)
+        if checked_out_at is None:
+            # Not ours, e.g. opened by the parent before a fork
+            self._discard(connection)
+            return
+        pool_checkout.labels(alias=self.alias).observe(time.monotonic() - checked_out_at)
+        try:
+            if self._reset(connection):
+                with self.lock:
+                    self.idle.append((connection, time.monotonic()))
+            else:
+                self._discard(connection)
+        finally:
+            self.slots.release()
+            self._update_gauge()
+
+    def _reset(self, connection):
+        """Leave the connection idle outside any transaction; False if it can't be reused."""
+        if connection.closed:
+            return False
+        status = connection.get_transaction_status()
+        if status == TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except Exception:
+                return False
+        return True
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Close the idle connections; checked out ones are closed when they are returned."""
+        with self.lock:
+            idle, self.idle = list(self.idle), deque()
+        for connection, idle_since in idle:
+            self._discard(connection)
+        self._update_gauge()
+
+    def _update_gauge(self):
+        pool_connections.labels(alias=self.alias, state='in_use').set(len(self.checked_out))
+        pool_connections.labels(alias=self.alias, state='idle').set(len(self.idle))
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, factory):
+    """
+    The pool for ``key`` in this process, created by ``factory()`` on first use.
+
+    Pools are per process: after a fork the child starts with fresh ones
+    rather than sharing sockets with its parent.
+    """
+    pid = os.getpid()
+    pool = _pools.get((pid, key))
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get((pid, key))
+            if pool is None:
+                pool = _pools[pid, key] = factory()
+    return pool
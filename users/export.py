@@ -0,0 +1,38 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .serializers import UserSerializer
+
+EXPORT_FIELDS = UserSerializer.Meta.fields
+
+
+class Echo:
+    """File-like object whose write() hands the line back to the caller."""
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, chunk_size):
+    # values() skips model instantiation; iterator() uses a server-side cursor on
+    # PostgreSQL so only one chunk is held in memory at a time.
+    return queryset.order_by('id').values(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def iter_ndjson(queryset, chunk_size):
+    for row in iter_rows(queryset, chunk_size):
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_csv(queryset, chunk_size):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in iter_rows(queryset, chunk_size):
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+EXPORT_FORMATS = {
+    'ndjson': (iter_ndjson, 'application/x-ndjson'),
+    'csv': (iter_csv, 'text/csv'),
+}
@@ -0,0 +1,66 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+class SparseFieldsMixin:
+    """
+    ``?fields=id,username`` narrows both the response and the SELECT.
+
+    Detail responses load the object with ``.only()`` the requested fields.
+    List responses skip per-instance ``ModelSerializer`` work altogether: rows
+    come from ``values()`` and are returned as dicts. That is only equivalent
+    because every serializer field is a plain model field; views whose
+    serializer has computed fields must not use this mixin. Put it after the
+    Cached*Mixin classes so cached list pages still short-circuit it.
+    """
+    fields_query_param = 'fields'
+
+    def get_available_fields(self):
+        return self.get_serializer_class().Meta.fields
+
+    def get_requested_fields(self):
+        """The requested fields in serializer order, or None for all of them."""
+        if not hasattr(self, '_requested_fields'):
+            # No request when the OpenAPI schema is prebuilt
+            param = self.request.query_params.get(self.fields_query_param) if self.request is not None else None
+            if not param:
+                self._requested_fields = None
+            else:
+                requested = {name.strip() for name in param.split(',') if name.strip()}
+                available = self.get_available_fields()
+                unknown = requested.difference(available)
+                if unknown:
+                    raise ValidationError({self.fields_query_param: f"Unknown field(s): {', '.join(sorted(unknown))}."})
+                self._requested_fields = [name for name in available if name in requested]
+        return self._requested_fields
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_requested_fields()
+        if fields is None:
+            return queryset
+        # updated_at is the version stamp behind ETag/Last-Modified
+        return queryset.only(*fields, 'updated_at')
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fields = self.get_requested_fields()
+        if fields is not None:
+            target = getattr(serializer, 'child', serializer)
+            for name in set(target.fields).difference(fields):
+                target.fields.pop(name)
+        return serializer
+
+    def list(self, request, *args, **kwargs):
+        fields = self.get_requested_fields() or self.get_available_fields()
+        queryset = self.filter_queryset(self.get_queryset())
+        # Cursor pagination reads its position from the ordering columns
+        ordering = self.paginator.get_ordering(request, queryset, self) if self.paginator else ()
+        columns = list(dict.fromkeys([*fields, *(name.lstrip('-') for name in ordering)]))
+        rows = queryset.values(*columns)
+
+        page = self.paginate_queryset(rows)
+        data = [{name: row[name] for name in fields} for row in (rows if page is None else page)]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
@@ -0,0 +1,31 @@
+from django.db.models import Q
+from rest_framework.filters import BaseFilterBackend
+
+
+class UserSearchFilter(BaseFilterBackend):
+    """
+    Server-side lookups over the user directory.
+
+    ``?username=ali`` (and ``email``, ``first_name``, ``last_name``, ``phone``)
+    narrows the list to values starting with the given prefix; these are served
+    by the ``varchar_pattern_ops`` indexes. ``?search=ali`` matches a
+    case-insensitive substring in any of those fields, served by the trigram
+    GIN indexes on PostgreSQL.
+    """
+    search_fields = ('username', 'email', 'first_name', 'last_name', 'phone')
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        for field in self.search_fields:
+            value = params.get(field)
+            if value:
+                queryset = queryset.filter(**{f'{field}__startswith': value})
+
+        term = params.get(self.search_param, '').strip()
+        if term:
+            condition = Q()
+            for field in self.search_fields:
+                condition |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(condition)
+        return queryset
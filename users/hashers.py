@@ -0,0 +1,117 @@
+"""
+Password hashers with cost parameters taken from settings, and background rehashing.
+
+``PASSWORD_HASHER`` picks the hasher used for new passwords (pbkdf2, argon2 or
+scrypt); the cost parameters come from the ``PASSWORD_*`` settings. When a login
+verifies a hash made with another hasher or older parameters, Django wants to
+rehash it inside the request. ``schedule_rehash`` hands that work to a small
+thread pool instead, so the login response does not pay for a second hash.
+At most ``PASSWORD_REHASH_QUEUE_SIZE`` rehashes wait for a thread; beyond that
+they are dropped (and counted), and happen at a later login instead.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher, make_password,
+)
+from django.db import connections
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+password_rehashes_dropped = Counter(
+    'user_directory_password_rehashes_dropped_total',
+    'Password rehashes skipped because the rehash queue was full',
+)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR
+
+
+class BoundedThreadPoolExecutor(ThreadPoolExecutor):
+    """A thread pool that refuses work once ``max_pending`` tasks are running or queued."""
+
+    def __init__(self, max_workers, max_pending, **kwargs):
+        super().__init__(max_workers=max_workers, **kwargs)
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def try_submit(self, fn, *args):
+        """Like ``submit``; returns None instead of queueing when the pool is full."""
+        if not self._slots.acquire(blocking=False):
+            return None
+
+        def run():
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release()
+
+        try:
+            return self.submit(run)
+        except BaseException:
+            self._slots.release()
+            raise
+
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        workers = settings.PASSWORD_REHASH_WORKERS
+        _executor = BoundedThreadPoolExecutor(
+            workers, workers + settings.PASSWORD_REHASH_QUEUE_SIZE, thread_name_prefix='rehash',
+        )
+    return _executor
+
+
+def rehash_password(pk, raw_password, encoded):
+    """Store a hash made with the preferred hasher, unless the password changed meanwhile."""
+    try:
+        get_user_model()._default_manager.filter(pk=pk, password=encoded).update(password=make_password(raw_password))
+    except Exception:
+        logger.exception("Password rehash failed for user ID %s", pk)
+
+
+def _rehash_in_thread(pk, raw_password, encoded):
+    try:
+        rehash_password(pk, raw_password, encoded)
+    finally:
+        # Pool threads open their own connections; don't leave them behind
+        connections.close_all()
+
+
+def schedule_rehash(user, raw_password):
+    """``setter`` for ``check_password``: upgrade the hash off the request path."""
+    if settings.PASSWORD_REHASH_WORKERS < 1:
+        rehash_password(user.pk, raw_password, user.password)
+    elif get_executor().try_submit(_rehash_in_thread, user.pk, raw_password, user.password) is None:
+        password_rehashes_dropped.inc()
@@ -0,0 +1,17 @@
+"""
+Initializer of the importer's password-hashing processes.
+
+They are spawned, so this module is imported before Django is set up and
+must not import models.
+"""
+import django
+from django.apps import apps
+from django.conf import settings
+
+
+def init_worker():
+    # Hashing workers log nothing: skip LOGGING, whose handlers would start a
+    # listener thread and open the log files in every worker
+    settings.LOGGING_CONFIG = None
+    if not apps.ready:
+        django.setup()
@@ -0,0 +1,184 @@
+import codecs
+import csv
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+
+from .cache import invalidate_user_list
+from .import_worker import init_worker
+from .serializers import UserImportSerializer
+
+User = get_user_model()
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    def add_error(self, row, errors):
+        self.errors.append({'row': row, 'errors': errors})
+
+    def as_dict(self):
+        return {'created': self.created, 'failed': len(self.errors), 'errors': self.errors}
+
+
+def detect_format(filename):
+    if filename.endswith('.csv'):
+        return 'csv'
+    if filename.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return None
+
+
+def read_rows(lines, fmt):
+    """Yield ``(row_number, row)`` pairs; unparsable rows are yielded as the exception."""
+    if fmt == 'csv':
+        # Row numbers match file line numbers, the header being line 1
+        yield from enumerate(csv.DictReader(lines), start=2)
+        return
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as exc:
+            yield number, exc
+
+
+def check_encoding(chunks, encoding='utf-8'):
+    """Raise ``UnicodeDecodeError`` unless the byte chunks decode, before any row is imported."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in chunks:
+        decoder.decode(chunk)
+    decoder.decode(b'', final=True)
+
+
+# One pool per process and size, started on first use and kept for later
+# imports. Workers are spawned, not forked: a fork of a threaded web worker
+# would copy locks held by other threads and rerun its at-fork hooks.
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=init_worker,
+            )
+        return pool
+
+
+def _discard_pool(workers, pool):
+    with _pools_lock:
+        if _pools.get(workers) is pool:
+            del _pools[workers]
+    pool.shutdown(wait=False)
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _validate_batch(batch, result):
+    candidates = []
+    for number, row in batch:
+        if not isinstance(row, dict):
+            result.add_error(number, {'non_field_errors': [f'Malformed row: {row}']})
+            continue
+        serializer = UserImportSerializer(data=row)
+        if not serializer.is_valid():
+            result.add_error(number, serializer.errors)
+            continue
+        data = serializer.validated_data
+        data['username'] = User.normalize_username(data['username'])
+        data['email'] = User.objects.normalize_email(data.get('email', ''))
+        candidates.append((number, data))
+
+    # One query per batch for usernames that already exist, plus duplicates within the batch
+    usernames = [data['username'] for _, data in candidates]
+    taken = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    valid = []
+    for number, data in candidates:
+        if data['username'] in taken:
+            result.add_error(number, {'username': ['A user with that username already exists.']})
+            continue
+        taken.add(data['username'])
+        valid.append((number, data))
+    return valid
+
+
+def _hash_passwords(valid, pool, workers):
+    passwords = [data.pop('password', '') or None for _, data in valid]
+    if pool is None:
+        hashed = [make_password(password) for password in passwords]
+    else:
+        chunksize = max(1, len(passwords) // (workers * 4))
+        hashed = pool.map(make_password, passwords, chunksize=chunksize)
+    for (_, data), password in zip(valid, hashed):
+        data['password'] = password
+
+
+def _write_batch(valid, result):
+    users = [User(**data) for _, data in valid]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+        result.created += len(users)
+        return
+    except IntegrityError:
+        pass
+    # Something raced us (e.g. a concurrent registration); retry row by row to
+    # report exactly which rows failed.
+    for (number, _), user in zip(valid, users):
+        user.pk = None
+        try:
+            with transaction.atomic():
+                user.save(force_insert=True)
+            result.created += 1
+        except IntegrityError as exc:
+            result.add_error(number, {'non_field_errors': [str(exc)]})
+
+
+def import_users(rows, batch_size=1000, workers=1):
+    """
+    Validate, hash and insert ``(row_number, row)`` pairs in batches.
+
+    With ``workers`` > 1 password hashing is spread across a process pool, which
+    is where almost all of the time goes; the pool is kept for later imports.
+    Each batch is inserted with a single ``bulk_create`` in its own transaction.
+    """
+    result = ImportResult()
+    pool = _get_pool(workers) if workers > 1 else None
+    try:
+        for batch in _chunked(rows, batch_size):
+            valid = _validate_batch(batch, result)
+            if not valid:
+                continue
+            _hash_passwords(valid, pool, workers)
+            _write_batch(valid, result)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a new pool next time
+        _discard_pool(workers, pool)
+        raise
+    result.errors.sort(key=lambda error: error['row'])
+    if result.created:
+        # bulk_create sends no post_save, so list pages are not invalidated by the signal handlers
+        invalidate_user_list()
+    return result
@@ -0,0 +1,174 @@
+"""
+Non-blocking logging: request threads only put records on a bounded queue.
+
+``QueuedHandler`` is the only handler attached to the loggers. A
+``QueueListener`` thread drains its queue and hands the records to the real
+handlers (console, rotating files), flushing each once per batch instead of
+once per record. When the queue is full, records below ``block_level`` are
+dropped immediately and records at or above it wait up to ``block_timeout``
+seconds for room; both outcomes are counted in Prometheus.
+
+The real handlers are passed in by dictConfig, which must have configured
+them first (it does so in name order):
+
+    'queue': {
+        '()': 'users.log_handlers.QueuedHandler',
+        'targets': ['cfg://handlers.console', 'cfg://handlers.file'],
+        'maxsize': 10000,
+    }
+"""
+import copy
+import json
+import logging
+import os
+import queue
+import weakref
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from prometheus_client import Counter
+
+log_records_dropped = Counter(
+    'user_directory_log_records_dropped_total',
+    'Log records dropped because the log queue was full',
+    ['level'],
+)
+log_records_blocked = Counter(
+    'user_directory_log_records_blocked_total',
+    'Log records whose caller had to wait for room in the log queue',
+    ['level'],
+)
+
+_exception_formatter = logging.Formatter()
+
+
+class BatchedRotatingFileHandler(RotatingFileHandler):
+    """A RotatingFileHandler that leaves flushing to QueuedHandler's listener, once per batch."""
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class BatchingQueueListener(QueueListener):
+    """Flushes its handlers when the queue runs empty or every ``batch_size`` records."""
+
+    def __init__(self, queue, *handlers, batch_size=100):
+        super().__init__(queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+        self.pending = 0
+
+    def handle(self, record):
+        super().handle(record)
+        self.pending += 1
+        if self.pending >= self.batch_size or self.queue.empty():
+            self.flush()
+
+    def flush(self):
+        self.pending = 0
+        for handler in self.handlers:
+            getattr(handler, 'flush_batch', handler.flush)()
+
+    def enqueue_sentinel(self):
+        # The queue is bounded: wait for room rather than failing with queue.Full
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        super().stop()
+        self.flush()
+
+
+# Listener threads do not survive fork(), e.g. of gunicorn workers from a preloaded master
+_queued_handlers = weakref.WeakSet()
+
+
+def _restart_listeners():
+    for handler in list(_queued_handlers):
+        if handler.listener is None:
+            continue
+        # The queue may hold records the parent's listener is still writing
+        handler.queue = queue.Queue(handler.queue.maxsize)
+        handler.start_listener()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listeners)
+
+
+class QueuedHandler(QueueHandler):
+    def __init__(self, targets, maxsize=10000, batch_size=100, block_level='ERROR', block_timeout=0.1):
+        # Indexing, unlike iterating, resolves the cfg:// references in dictConfig's lists
+        targets = [targets[i] for i in range(len(targets))]
+        for target in targets:
+            if not isinstance(target, logging.Handler):
+                # dictConfig only defers MemoryHandler targets; handlers are set up in name order
+                raise TypeError(f'Log handler {target!r} must be configured before the queue handler')
+        super().__init__(queue.Queue(maxsize))
+        self.targets = targets
+        self.batch_size = batch_size
+        self.block_level = logging.getLevelName(block_level) if isinstance(block_level, str) else block_level
+        self.block_timeout = block_timeout
+        self.listener = None
+        self.start_listener()
+        _queued_handlers.add(self)
+
+    def start_listener(self):
+        self.listener = BatchingQueueListener(self.queue, *self.targets, batch_size=self.batch_size)
+        self.listener.start()
+
+    def prepare(self, record):
+        """Merge the arguments now (they may be mutated later) and render any traceback."""
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            if record.levelno < self.block_level:
+                log_records_dropped.labels(level=record.levelname).inc()
+                return
+        log_records_blocked.labels(level=record.levelname).inc()
+        try:
+            self.queue.put(record, timeout=self.block_timeout)
+        except queue.Full:
+            log_records_dropped.labels(level=record.levelname).inc()
+
+    def stop(self):
+        """Write out everything queued so far and stop the listener thread."""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def close(self):
+        # logging.shutdown() closes handlers at exit, so queued records are written out
+        self.stop()
+        super().close()
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'process': record.process,
+            'thread': record.thread,
+            'message': record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
@@ -0,0 +1,24 @@
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.schema import SCHEMA_FORMATS, build_schema
+
+
+class Command(BaseCommand):
+    help = 'Writes the OpenAPI schema to OPENAPI_SCHEMA_DIR so it is served without introspecting the views'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', default=settings.OPENAPI_SCHEMA_DIR,
+                            help='Directory for openapi.json and openapi.yaml (default: OPENAPI_SCHEMA_DIR)')
+
+    def handle(self, *args, **options):
+        output_dir = Path(options['output_dir'])
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for fmt in SCHEMA_FORMATS:
+            path = output_dir / f'openapi{fmt}'
+            # Written next to the target and renamed, so workers never read a partial file
+            tmp_path = path.with_name(f'.{path.name}.tmp')
+            tmp_path.write_bytes(build_schema(fmt))
+            tmp_path.replace(path)
+            self.stdout.write(self.style.SUCCESS(f'Wrote {path}'))
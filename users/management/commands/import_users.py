@@ -0,0 +1,42 @@
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from users.importer import IMPORT_FORMATS, detect_format, import_users, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Imports users in bulk from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or NDJSON file to import, or '-' to read from stdin")
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='Input format (default: guessed from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=settings.USER_IMPORT_BATCH_SIZE,
+                            help='Rows validated and inserted per transaction')
+        parser.add_argument('--workers', type=int, default=settings.USER_IMPORT_WORKERS,
+                            help='Processes used for password hashing (1 disables the pool)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+        if fmt is None:
+            raise CommandError('Cannot guess the input format, pass --format csv or --format ndjson')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be a positive integer')
+
+        try:
+            stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(f'Cannot open {path}: {exc.strerror}')
+        try:
+            result = import_users(read_rows(stream, fmt), batch_size=options['batch_size'], workers=options['workers'])
+        except UnicodeDecodeError as exc:
+            # Batches before the undecodable line have been imported already
+            raise CommandError(f'{path} is not UTF-8 encoded: {exc}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for error in result.errors:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        style = self.style.SUCCESS if not result.errors else self.style.WARNING
+        self.stdout.write(style(f'Imported {result.created} users, {len(result.errors)} rows rejected'))
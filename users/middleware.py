@@ -0,0 +1,162 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from prometheus_client import Histogram
+
+from .routers import routing_state
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, float('inf'))
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float('inf'))
+
+view_db_queries = Histogram(
+    'django_view_db_queries',
+    'SQL queries executed per request, by view',
+    ['view'],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+view_db_time = Histogram(
+    'django_view_db_time_seconds',
+    'Total time spent in SQL per request, by view',
+    ['view'],
+    buckets=DB_TIME_BUCKETS,
+)
+view_db_slowest_query = Histogram(
+    'django_view_db_slowest_query_seconds',
+    'Duration of the slowest SQL statement per request, by view',
+    ['view'],
+    buckets=DB_TIME_BUCKETS,
+)
+
+
+class QueryRecorder:
+    """``execute_wrapper`` hook counting and timing every statement of a request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_duration = 0.0
+        self.slowest_sql = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            if elapsed > self.slowest_duration:
+                self.slowest_duration = elapsed
+                self.slowest_sql = sql
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Record query count, DB time and the slowest statement per view.
+
+    Results go to Prometheus histograms labelled by view name, to a
+    ``Server-Timing`` header (visible in browser devtools), and to a warning
+    log when a request runs more than ``QUERY_COUNT_WARNING_THRESHOLD``
+    queries, which usually means an N+1 pattern.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        with self.recording(recorder):
+            response = self.get_response(request)
+        return self.report(request, response, recorder)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        # Connections are per thread: install the hook in the thread that runs this request's sync code
+        stack = await sync_to_async(self.recording)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.report(request, response, recorder)
+
+    @staticmethod
+    def recording(recorder):
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        return stack
+
+    def report(self, request, response, recorder):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else '<unresolved>'
+        view_db_queries.labels(view=view).observe(recorder.count)
+        view_db_time.labels(view=view).observe(recorder.duration)
+        view_db_slowest_query.labels(view=view).observe(recorder.slowest_duration)
+
+        if recorder.count > settings.QUERY_COUNT_WARNING_THRESHOLD:
+            logger.warning(
+                'Possible N+1 in %s: %d queries in %.1f ms; slowest (%.1f ms): %s',
+                view, recorder.count, recorder.duration * 1000, recorder.slowest_duration * 1000, recorder.slowest_sql,
+            )
+
+        response['Server-Timing'] = (
+            f'db;dur={recorder.duration * 1000:.2f};desc="{recorder.count} queries", '
+            f'db-slowest;dur={recorder.slowest_duration * 1000:.2f}'
+        )
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Keep clients that just changed a user on the primary database for a while.
+
+    Requests carrying the pin cookie never read from a replica. A request that
+    writes to a ``users`` model (see ``users.routers``) sets the cookie for
+    ``REPLICA_PIN_SECONDS``, the longest replication lag we expect.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routing_state(self.pinned(request)) as state:
+            response = self.get_response(request)
+        return self.pin(response, state)
+
+    async def __acall__(self, request):
+        # The ContextVar is set and reset in this task; sync_to_async threads get a copy of the context
+        with routing_state(self.pinned(request)) as state:
+            response = await self.get_response(request)
+        return self.pin(response, state)
+
+    @staticmethod
+    def pinned(request):
+        return settings.REPLICA_PIN_COOKIE in request.COOKIES
+
+    @staticmethod
+    def pin(response, state):
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
@@ -1,12 +1,33 @@
+from functools import partial
+
 from django.db import models
+from django.contrib.auth.hashers import check_password
 from django.contrib.auth.models import AbstractUser
 
+from .hashers import schedule_rehash
+
 # Create your models here.
 
 class CustomUser(AbstractUser):
     # Add any additional fields you need
     phone = models.CharField(max_length=15, blank=True, null=True)
     address = models.TextField(blank=True, null=True)
+    # Version stamp for ETag/Last-Modified; not bumped by QuerySet.update()/bulk_update()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta(AbstractUser.Meta):
+        # Prefix lookups (LIKE 'abc%') on PostgreSQL need pattern_ops indexes;
+        # username already gets one from its unique constraint.
+        indexes = [
+            models.Index(fields=['email'], name='users_email_prefix_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['first_name'], name='users_first_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['last_name'], name='users_last_name_prefix_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['phone'], name='users_phone_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ]
 
     def __str__(self):
         return self.username
+
+    def check_password(self, raw_password):
+        # Upgrading an outdated hash happens in the background, not in the login request
+        return check_password(raw_password, self.password, partial(schedule_rehash, self))
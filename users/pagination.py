@@ -0,0 +1,42 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class UserCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the user directory.
+
+    Pages are selected with ``WHERE id > <cursor> ORDER BY id LIMIT n`` instead of
+    OFFSET, so every page costs the same no matter how deep the client is.
+    ``?ordering=username`` switches to the ``(username, id)`` key.
+
+    With ``opt_in`` set (the default for API views) the list stays unpaginated
+    unless the client sends ``cursor`` or ``page_size``, so existing clients
+    keep receiving a plain list.
+    """
+    page_size_query_param = 'page_size'
+    ordering_query_param = 'ordering'
+    orderings = {
+        'id': ('id',),
+        'username': ('username', 'id'),
+    }
+    ordering = orderings['id']
+
+    def __init__(self, opt_in=True):
+        self.opt_in = opt_in
+        rest_settings = getattr(settings, 'REST_FRAMEWORK', {})
+        self.page_size = rest_settings.get('PAGE_SIZE') or 50
+        self.max_page_size = rest_settings.get('MAX_PAGE_SIZE', 100)
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.opt_in and not self.is_requested(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        key = request.query_params.get(self.ordering_query_param, 'id')
+        return self.orderings.get(key, self.ordering)
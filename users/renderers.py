@@ -0,0 +1,41 @@
+"""
+orjson-based drop-ins for DRF's JSONRenderer and JSONParser.
+
+Enable them with ``API_JSON_BACKEND=orjson``. Output matches the stdlib
+renderer for everything serializers emit: str/int/float/bool/None, dicts
+and lists (including ReturnDict/ReturnList and ErrorDetail subclasses). Other
+values (lazy translations, datetimes, decimals, UUIDs, querysets) go through
+DRF's own JSONEncoder.default, so they render exactly as before.
+
+One difference: NaN and Infinity floats are written as ``null``, where the
+stdlib renderer (``STRICT_JSON``) raises ValueError. The user API has no
+float fields, which is why orjson is safe to enable here.
+"""
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+# Datetimes are passed through to DRF's encoder so they keep DRF's ISO format
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        options = OPTIONS
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            # orjson only supports two-space indentation
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=self.encoder_class().default, option=options)
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,121 @@
+"""
+Send directory reads to read replicas and everything else to the primary.
+
+Only code running inside ``replica_reads()`` (the list and detail views, via
+``ReplicaReadMixin``) reads ``users`` models from one of
+``DATABASE_REPLICAS``; authentication, other reads and all writes use
+``default``. A write to a ``users`` model during a request makes
+``ReplicaPinMiddleware`` set a cookie that keeps the client on the primary
+for ``REPLICA_PIN_SECONDS``, so people see their own updates even while the
+replicas lag behind. Writes inside ``unpinned_writes()``, such as recording
+``last_login``, do not count.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+ROUTED_APPS = {'users'}
+
+
+class RoutingState:
+    """Per-request routing flags; mutable so that updates made in sync_to_async threads are seen."""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.replica_reads = False
+        self.used_replica = False
+        self.wrote = False
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+@contextmanager
+def routing_state(pinned=False):
+    state = RoutingState(pinned)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    """Allow reads of ``users`` models to go to a replica; usable as a decorator."""
+    state = _state.get()
+    if state is None:
+        # Outside a request (shell, management commands): always read the primary
+        yield
+        return
+    previous, state.replica_reads = state.replica_reads, True
+    try:
+        yield
+    finally:
+        state.replica_reads = previous
+
+
+@contextmanager
+def unpinned_writes():
+    """Writes made inside do not pin the client to the primary; for bookkeeping it never reads back."""
+    state = _state.get()
+    if state is None:
+        yield
+        return
+    wrote = state.wrote
+    try:
+        yield
+    finally:
+        state.wrote = wrote
+
+
+def read_from_replica():
+    """Whether the current request has read anything from a replica."""
+    state = _state.get()
+    return state is not None and state.used_replica
+
+
+class ReplicaReadMixin:
+    """Serve GET from a replica unless the client is pinned to the primary."""
+
+    def get(self, request, *args, **kwargs):
+        with replica_reads():
+            return super().get(request, *args, **kwargs)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            not settings.DATABASE_REPLICAS
+            or model._meta.app_label not in ROUTED_APPS
+            or state is None
+            or not state.replica_reads
+            or state.pinned
+            or state.wrote
+        ):
+            return None
+        state.used_replica = True
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and model._meta.app_label in ROUTED_APPS:
+            state.wrote = True
+        # Also for instances loaded from a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,155 @@
+"""
+OpenAPI documentation without importing drf_yasg in API workers.
+
+Views describe their operations with ``swagger_auto_schema`` and ``openapi``
+from this module. Both only record what they are given; drf_yasg is imported
+and the real decorator applied the first time a schema is generated.
+
+The schema is prebuilt at deploy time with ``manage.py build_openapi_schema``
+and served from ``OPENAPI_SCHEMA_DIR`` with long-lived caching headers and an
+ETag. Without a prebuilt file it is generated once per process. The Swagger
+UI and ReDoc pages load it from that URL instead of generating their own.
+"""
+import functools
+import hashlib
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+from rest_framework import permissions
+
+SCHEMA_FORMATS = {'.json': 'application/json', '.yaml': 'application/yaml'}
+
+_pending_overrides = []
+_overrides_lock = threading.Lock()
+
+
+class _Deferred:
+    """``drf_yasg.openapi.<name>``, or a call of it, evaluated once drf_yasg is imported."""
+
+    def __init__(self, name, args=None, kwargs=None):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+
+    def __call__(self, *args, **kwargs):
+        return _Deferred(self.name, args, kwargs)
+
+    def resolve(self):
+        from drf_yasg import openapi as drf_yasg_openapi
+
+        target = getattr(drf_yasg_openapi, self.name)
+        if self.args is None:
+            return target
+        return target(*_resolve(self.args), **_resolve(self.kwargs))
+
+
+def _resolve(value):
+    if isinstance(value, _Deferred):
+        return value.resolve()
+    if isinstance(value, dict):
+        return {key: _resolve(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_resolve(item) for item in value)
+    return value
+
+
+class _LazyOpenAPI:
+    def __getattr__(self, name):
+        return _Deferred(name)
+
+
+openapi = _LazyOpenAPI()
+
+
+def swagger_auto_schema(**overrides):
+    """Record ``drf_yasg.utils.swagger_auto_schema`` overrides for a view method."""
+    def decorator(view_method):
+        with _overrides_lock:
+            _pending_overrides.append((view_method, overrides))
+        return view_method
+    return decorator
+
+
+def apply_overrides():
+    from drf_yasg.utils import swagger_auto_schema as drf_yasg_swagger_auto_schema
+
+    with _overrides_lock:
+        while _pending_overrides:
+            view_method, overrides = _pending_overrides.pop()
+            drf_yasg_swagger_auto_schema(**_resolve(overrides))(view_method)
+
+
+def get_info():
+    return openapi.Info(
+        title="User Directory API",
+        default_version='v1',
+        description="API documentation for User Directory",
+        terms_of_service="https://www.google.com/policies/terms/",
+        contact=openapi.Contact(email="contact@snippets.local"),
+        license=openapi.License(name="BSD License"),
+    ).resolve()
+
+
+@functools.lru_cache(maxsize=None)
+def schema_view():
+    """drf_yasg's SchemaView for this API, built on first use."""
+    from drf_yasg.views import get_schema_view
+
+    apply_overrides()
+    return get_schema_view(get_info(), public=True, permission_classes=(permissions.AllowAny,))
+
+
+def build_schema(fmt):
+    """The public schema encoded as ``.json`` or ``.yaml``."""
+    from django.urls import get_resolver
+    from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    # Importing the URLconf imports the views, which register their overrides
+    get_resolver().url_patterns
+    apply_overrides()
+    schema = OpenAPISchemaGenerator(get_info()).get_schema(request=None, public=True)
+    codec = OpenAPICodecJson if fmt == '.json' else OpenAPICodecYaml
+    return codec(validators=[]).encode(schema)
+
+
+def schema_path(fmt):
+    return Path(settings.OPENAPI_SCHEMA_DIR) / f'openapi{fmt}'
+
+
+@functools.lru_cache(maxsize=None)
+def load_schema(fmt):
+    """``(body, etag)`` of the prebuilt schema, generated here if it was not prebuilt."""
+    try:
+        body = schema_path(fmt).read_bytes()
+    except FileNotFoundError:
+        body = build_schema(fmt)
+    return body, f'"{hashlib.md5(body).hexdigest()}"'
+
+
+@require_safe
+def schema_document(request, format):
+    body, etag = load_schema(format)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type=SCHEMA_FORMATS[format])
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.OPENAPI_SCHEMA_MAX_AGE)
+    return response
+
+
+@functools.lru_cache(maxsize=None)
+def _ui_view(renderer):
+    return schema_view().with_ui(renderer, cache_timeout=0)
+
+
+def swagger_ui(request):
+    return _ui_view('swagger')(request)
+
+
+def redoc(request):
+    return _ui_view('redoc')(request)
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.contrib.auth.password_validation import validate_password
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
@@ -31,6 +32,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         # Add custom claims
         token['username'] = user.username
         token['email'] = user.email
+        token['is_staff'] = user.is_staff
         return token
 
 class UserSerializer(serializers.ModelSerializer):
@@ -38,3 +40,18 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'phone', 'address')
         read_only_fields = ('id',)
+
+class UserBulkUpdateSerializer(UserSerializer):
+    class Meta(UserSerializer.Meta):
+        # Username uniqueness is checked once per request by bulk_update_users
+        extra_kwargs = {'username': {'validators': [UnicodeUsernameValidator()]}}
+
+class UserImportSerializer(serializers.ModelSerializer):
+    password = serializers.CharField(write_only=True, required=False, allow_blank=True)
+
+    class Meta:
+        model = User
+        fields = ('username', 'email', 'password', 'first_name', 'last_name', 'phone', 'address')
+        # Username uniqueness is checked once per batch by the importer instead of
+        # with one SELECT per row.
+        extra_kwargs = {'username': {'validators': [UnicodeUsernameValidator()]}}
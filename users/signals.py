@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model, user_logged_in
+from django.contrib.auth.models import update_last_login
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import CACHED_FIELDS, invalidate_user
+from .routers import unpinned_writes
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def invalidate_on_save(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login, which is not part of the cached payload
+    if update_fields and not CACHED_FIELDS.intersection(update_fields):
+        return
+    invalidate_user(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_on_delete(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+# Replaces django.contrib.auth's receiver, registered under the same dispatch_uid
+# whichever app is ready first: the client never reads last_login back, so a
+# login should not pin it to the primary.
+user_logged_in.disconnect(dispatch_uid='update_last_login')
+
+
+@receiver(user_logged_in, dispatch_uid='update_last_login')
+def update_last_login_unpinned(sender, user, **kwargs):
+    with unpinned_writes():
+        update_last_login(sender, user, **kwargs)
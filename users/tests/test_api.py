@@ -1,7 +1,13 @@
+import base64
+import json
 import pytest
 from django.urls import reverse
 from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from users.serializers import UserSerializer
 
 User = get_user_model()
 
@@ -105,4 +111,422 @@ def test_user_update_api():
     assert response.status_code == 200
     assert response.data['first_name'] == 'Admin Updated'
 
+@pytest.mark.django_db
+def test_user_list_api_cursor_pagination():
+    admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='admin12345')
+    for i in range(4):
+        User.objects.create_user(username=f'user{i}', password='12345')
+
+    client = APIClient()
+    client.force_authenticate(user=admin)
+
+    # Without cursor/page_size the list stays unpaginated
+    response = client.get(reverse('api_user_list'))
+    assert response.status_code == 200
+    assert len(response.data) == 5
+
+    response = client.get(reverse('api_user_list'), {'page_size': 2})
+    assert response.status_code == 200
+    assert [u['username'] for u in response.data['results']] == ['admin', 'user0']
+    assert response.data['previous'] is None
+
+    response = client.get(response.data['next'])
+    assert [u['username'] for u in response.data['results']] == ['user1', 'user2']
+
+    response = client.get(response.data['previous'])
+    assert [u['username'] for u in response.data['results']] == ['admin', 'user0']
+
+    response = client.get(reverse('api_user_list'), {'page_size': 3, 'ordering': 'username'})
+    assert [u['username'] for u in response.data['results']] == ['admin', 'user0', 'user1']
+
+@pytest.mark.django_db
+def test_user_list_api_page_size_is_capped(settings):
+    settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK, 'MAX_PAGE_SIZE': 2}
+    admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='admin12345')
+    for i in range(3):
+        User.objects.create_user(username=f'user{i}', password='12345')
+
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    response = client.get(reverse('api_user_list'), {'page_size': 1000})
+    assert len(response.data['results']) == 2
+
 # Add more API tests as needed
+
+@pytest.mark.django_db
+def test_user_list_api_filtering():
+    admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='admin12345')
+    User.objects.create_user(username='alice', email='alice@corp.io', first_name='Alice', phone='555-0100', password='12345')
+    User.objects.create_user(username='alicia', email='alicia@home.net', last_name='Keys', password='12345')
+    User.objects.create_user(username='bob', email='bob@corp.io', last_name='Malice', password='12345')
+
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    url = reverse('api_user_list')
+
+    response = client.get(url, {'username': 'ali'})
+    assert sorted(u['username'] for u in response.data) == ['alice', 'alicia']
+
+    response = client.get(url, {'username': 'ali', 'email': 'alice@'})
+    assert [u['username'] for u in response.data] == ['alice']
+
+    response = client.get(url, {'phone': '555'})
+    assert [u['username'] for u in response.data] == ['alice']
+
+    # Substring search is case-insensitive and spans all searchable fields
+    response = client.get(url, {'search': 'ALIC'})
+    assert sorted(u['username'] for u in response.data) == ['alice', 'alicia', 'bob']
+
+    response = client.get(url, {'search': 'corp', 'page_size': 1})
+    assert [u['username'] for u in response.data['results']] == ['alice']
+
+@pytest.mark.django_db
+def test_user_export_api():
+    user = User.objects.create_user(username='testuser', email='test@example.com', password='12345')
+    admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='admin12345')
+
+    client = APIClient()
+    url = reverse('api_user_export')
+
+    # Only staff can export
+    client.force_authenticate(user=user)
+    assert client.get(url).status_code == 403
+
+    client.force_authenticate(user=admin)
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/x-ndjson'
+    rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+    assert [row['username'] for row in rows] == ['testuser', 'admin']
+    assert set(rows[0]) == set(UserSerializer.Meta.fields)
+
+    response = client.get(url, {'output': 'csv', 'username': 'test'})
+    assert response['Content-Type'] == 'text/csv'
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert lines[0] == ','.join(UserSerializer.Meta.fields)
+    assert lines[1].startswith(f'{user.id},testuser,test@example.com')
+    assert len(lines) == 2
+
+    assert client.get(url, {'output': 'xml'}).status_code == 400
+
+@pytest.mark.django_db
+def test_user_bulk_import_api(settings):
+    settings.USER_IMPORT_WORKERS = 1
+    User.objects.create_user(username='existing', password='12345')
+    user = User.objects.create_user(username='testuser', password='12345')
+    admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='admin12345')
+
+    client = APIClient()
+    url = reverse('api_user_import')
+    rows = [
+        {'username': 'new1', 'email': 'new1@example.com', 'password': 'pass12345'},
+        {'username': 'existing', 'email': 'dup@example.com'},
+        {'username': 'new2', 'email': 'not-an-email'},
+        {'username': 'new1'},
+        {'username': 'new3', 'phone': '555-0100'},
+    ]
+
+    client.force_authenticate(user=user)
+    assert client.post(url, rows, format='json').status_code == 403
+
+    client.force_authenticate(user=admin)
+    response = client.post(url, rows, format='json')
+    assert response.status_code == 200
+    assert response.data['created'] == 2
+    assert [error['row'] for error in response.data['errors']] == [2, 3, 4]
+    assert User.objects.get(username='new1').check_password('pass12345')
+    assert not User.objects.get(username='new3').has_usable_password()
+
+    upload = SimpleUploadedFile('users.csv', b'username,email\ncsvuser,csv@example.com\n', content_type='text/csv')
+    response = client.post(url, {'file': upload}, format='multipart')
+    assert response.data['created'] == 1
+    assert User.objects.filter(username='csvuser', email='csv@example.com').exists()
+
+    upload = SimpleUploadedFile('users.csv', 'username\nlatin1user\nJosé\n'.encode('latin-1'), content_type='text/csv')
+    response = client.post(url, {'file': upload}, format='multipart')
+    assert response.status_code == 400
+    assert not User.objects.filter(username='latin1user').exists()
+
+@pytest.mark.django_db
+def test_user_detail_api_conditional_get(django_assert_max_num_queries):
+    user = User.objects.create_user(username='testuser', password='12345')
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('api_user_detail', args=[user.id])
+
+    response = client.get(url)
+    etag = response['ETag']
+    assert response['Last-Modified']
+
+    cache.clear()
+    with django_assert_max_num_queries(1):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    user.first_name = 'Changed'
+    user.save()
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+@pytest.mark.django_db(transaction=True)
+def test_user_list_api_conditional_get():
+    user = User.objects.create_user(username='testuser', password='12345')
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('api_user_list')
+
+    etag = client.get(url)['ETag']
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    # The ETag depends on the query string
+    assert client.get(url, {'search': 'test'}, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    other = User.objects.create_user(username='otheruser', password='12345')
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+    etag = client.get(url)['ETag']
+    other.delete()
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+@pytest.mark.django_db(transaction=True)
+def test_user_update_api_if_match():
+    user = User.objects.create_user(username='testuser', password='12345')
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('api_user_update', args=[user.id])
+
+    etag = client.get(reverse('api_user_detail', args=[user.id]))['ETag']
+    response = client.patch(url, {'first_name': 'First'}, HTTP_IF_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+    # A second writer still holding the old ETag is rejected
+    response = client.patch(url, {'first_name': 'Second'}, HTTP_IF_MATCH=etag)
+    assert response.status_code == 412
+    user.refresh_from_db()
+    assert user.first_name == 'First'
+
+    etag = client.get(reverse('api_user_detail', args=[user.id]))['ETag']
+    assert client.patch(url, {'first_name': 'Third'}, HTTP_IF_MATCH=etag).status_code == 200
+
+    # A missing user has no representation for any ETag to match
+    client.force_authenticate(user=User.objects.create_superuser('admin', 'admin@example.com', 'admin12345'))
+    missing = reverse('api_user_update', args=[user.id + 100])
+    assert client.patch(missing, {'first_name': 'Fourth'}, HTTP_IF_MATCH='*').status_code == 412
+    assert client.patch(missing, {'first_name': 'Fourth'}, HTTP_IF_MATCH=etag).status_code == 412
+    assert client.patch(missing, {'first_name': 'Fourth'}).status_code == 404
+
+@pytest.mark.django_db
+def test_jwt_read_skips_user_lookup(django_assert_num_queries):
+    user = User.objects.create_user(username='testuser', password='12345')
+    other = User.objects.create_user(username='otheruser', password='12345')
+    client = APIClient()
+    access = client.post(reverse('api_login'), {'username': 'testuser', 'password': '12345'}).data['access']
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+    url = reverse('api_user_detail', args=[user.id])
+
+    client.get(url)
+    # Served from cache: the token claims are enough, no CustomUser SELECT
+    with django_assert_num_queries(0):
+        response = client.get(url)
+    assert response.status_code == 200
+    assert response.data['username'] == 'testuser'
+    assert client.get(reverse('api_user_detail', args=[other.id])).status_code == 403
+
+    # Writes load the full user, so a deactivated account is rejected
+    User.objects.filter(pk=user.pk).update(is_active=False)
+    response = client.patch(reverse('api_user_update', args=[user.id]), {'first_name': 'Blocked'})
+    assert response.status_code == 403
+    assert User.objects.get(pk=user.pk).first_name == ''
+
+@pytest.mark.django_db
+def test_jwt_claims_user_falls_back_to_database():
+    from users.authentication import ClaimsUser
+    from users.serializers import CustomTokenObtainPairSerializer
+
+    admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='admin12345',
+                                          first_name='Ada')
+    user = ClaimsUser(CustomTokenObtainPairSerializer.get_token(admin).access_token)
+    assert user == admin
+    assert user.is_staff and user.email == 'admin@example.com'
+    assert user.first_name == 'Ada'
+    # Not in the claims: TokenUser's fixed defaults must not hide the row's values
+    assert user.is_superuser
+    assert user.has_perm('users.change_customuser')
+
+    User.objects.filter(pk=admin.pk).update(is_active=False)
+    token = CustomTokenObtainPairSerializer.get_token(admin).access_token
+    del token['is_staff']
+    user = ClaimsUser(token)
+    assert not user.is_active
+    assert user.is_staff
+
+@pytest.mark.django_db
+def test_basic_auth_caches_verified_credentials(monkeypatch):
+    user = User.objects.create_user(username='testuser', password='12345')
+    checks = []
+    check_password = User.check_password
+    monkeypatch.setattr(User, 'check_password', lambda self, raw: checks.append(raw) or check_password(self, raw))
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Basic ' + base64.b64encode(b'testuser:12345').decode())
+    url = reverse('api_user_detail', args=[user.id])
+
+    assert client.get(url).status_code == 200
+    assert client.get(url).status_code == 200
+    assert len(checks) == 1
+
+    # A wrong password is never served from the cache
+    bad = APIClient()
+    bad.credentials(HTTP_AUTHORIZATION='Basic ' + base64.b64encode(b'testuser:wrong').decode())
+    assert bad.get(url).status_code == 403
+
+    # Changing the password invalidates the cached verification
+    user.set_password('67890')
+    user.save()
+    assert client.get(url).status_code == 403
+
+@pytest.mark.django_db
+def test_user_batch_api(settings, django_assert_num_queries):
+    user = User.objects.create_user(username='testuser', password='12345')
+    other = User.objects.create_user(username='otheruser', password='12345')
+    admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='admin12345')
+    client = APIClient()
+    url = reverse('api_user_batch')
+
+    assert client.get(url, {'ids': user.id}).status_code == 403
+
+    client.force_authenticate(user=user)
+    response = client.get(url, {'ids': f'{other.id},{user.id},999,{user.id}'})
+    assert response.status_code == 200
+    assert [row['username'] for row in response.data['results']] == ['testuser']
+    assert response.data['not_found'] == [999]
+    assert response.data['forbidden'] == [other.id]
+
+    client.force_authenticate(user=admin)
+    with django_assert_num_queries(1):
+        response = client.get(url, {'ids': f'{user.id},{other.id},{admin.id}'})
+    assert [row['id'] for row in response.data['results']] == [user.id, other.id, admin.id]
+
+    assert client.get(url, {'ids': 'a,b'}).status_code == 400
+    assert client.get(url, {'ids': f'{user.id},{2 ** 63}'}).status_code == 400
+    assert client.get(url, {'ids': '0'}).status_code == 400
+    assert client.get(url).status_code == 400
+    settings.USER_BATCH_MAX_IDS = 2
+    assert client.get(url, {'ids': '1,2,3'}).status_code == 400
+
+@pytest.mark.django_db(transaction=True)
+def test_user_bulk_update_api():
+    users = [User.objects.create_user(username=f'user{i}', password='12345') for i in range(3)]
+    admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='admin12345')
+    client = APIClient()
+    url = reverse('api_user_bulk_update')
+
+    client.force_authenticate(user=users[0])
+    assert client.patch(url, [{'id': users[0].id, 'phone': '1'}], format='json').status_code == 403
+
+    client.force_authenticate(user=admin)
+    detail_url = reverse('api_user_detail', args=[users[0].id])
+    etag = client.get(detail_url)['ETag']
+    items = [
+        {'id': users[0].id, 'phone': '555-0001'},
+        {'id': users[1].id, 'address': '1 New Street', 'first_name': 'Bulk'},
+        {'id': users[2].id, 'email': 'not-an-email'},
+        {'id': 999, 'phone': '555-0003'},
+        {'phone': '555-0004'},
+    ]
+    response = client.patch(url, items, format='json')
+    assert response.status_code == 200
+    assert response.data['updated'] == 2
+    assert [item['status'] for item in response.data['results']] == ['updated', 'updated', 'invalid', 'not_found', 'invalid']
+    assert 'email' in response.data['results'][2]['errors']
+
+    first, second, third = (User.objects.get(pk=user.pk) for user in users)
+    assert first.phone == '555-0001' and first.first_name == ''
+    assert second.address == '1 New Street' and second.first_name == 'Bulk'
+    assert third.email == ''
+    assert first.updated_at > users[0].updated_at
+
+    # bulk_update sends no signals; the cached detail and its ETag must still change
+    response = client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data['phone'] == '555-0001'
+
+    assert client.patch(url, {'id': users[0].id}, format='json').status_code == 400
+
+@pytest.mark.django_db
+def test_user_bulk_update_api_usernames(django_assert_num_queries, monkeypatch):
+    users = [User.objects.create_user(username=f'user{i}', password='12345') for i in range(4)]
+    admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='admin12345')
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    url = reverse('api_user_bulk_update')
+    items = [
+        {'id': users[0].id, 'username': 'renamed'},
+        {'id': users[1].id, 'username': 'renamed'},
+        {'id': users[2].id, 'username': 'user3'},
+        {'id': users[3].id, 'username': 'user3', 'phone': '555-0003'},
+    ]
+    # Savepoint, one user lookup, one username lookup, one UPDATE, release
+    with django_assert_num_queries(5):
+        response = client.patch(url, items, format='json')
+    assert response.status_code == 200
+    assert [item['status'] for item in response.data['results']] == ['updated', 'invalid', 'invalid', 'updated']
+    assert response.data['results'][1]['errors'] == {'username': ['Duplicate username in this request.']}
+    assert response.data['results'][2]['errors'] == {'username': ['A user with that username already exists.']}
+    assert User.objects.get(pk=users[0].pk).username == 'renamed'
+    assert User.objects.get(pk=users[3].pk).phone == '555-0003'
+
+    def conflict(*args, **kwargs):
+        raise IntegrityError('duplicate key value violates unique constraint')
+    monkeypatch.setattr(User.objects, 'bulk_update', conflict)
+    response = client.patch(url, [{'id': users[1].id, 'username': 'taken-meanwhile'}], format='json')
+    assert response.status_code == 409
+    assert User.objects.get(pk=users[1].pk).username == 'user1'
+
+@pytest.mark.django_db
+def test_user_list_api_sparse_fields():
+    user = User.objects.create_user(username='testuser', password='12345', phone='555-1234', address='1 Main St')
+    User.objects.create_user(username='another', password='12345', email='a@example.com')
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('api_user_list')
+
+    # The values() fast path renders exactly what UserSerializer would
+    response = client.get(url)
+    expected = UserSerializer(User.objects.order_by('id'), many=True).data
+    assert sorted(response.data, key=lambda row: row['id']) == expected
+
+    response = client.get(url, {'fields': 'username,id'})
+    assert all(list(row) == ['id', 'username'] for row in response.data)
+
+    # Ordering columns are fetched for the cursor but not returned
+    response = client.get(url, {'fields': 'id', 'ordering': 'username', 'page_size': 1})
+    assert response.data['results'] == [{'id': User.objects.get(username='another').id}]
+    response = client.get(response.data['next'])
+    assert response.data['results'] == [{'id': user.id}]
+
+    response = client.get(url, {'fields': 'id,password'})
+    assert response.status_code == 400
+    assert 'password' in str(response.data['fields'])
+
+@pytest.mark.django_db
+def test_user_detail_api_sparse_fields(django_assert_num_queries):
+    user = User.objects.create_user(username='testuser', password='12345', address='1 Main St')
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('api_user_detail', args=[user.id])
+
+    response = client.get(url, {'fields': 'id,username'})
+    assert response.data == {'id': user.id, 'username': 'testuser'}
+    # A narrowed response is not cached in place of the full payload
+    assert client.get(url).data['address'] == '1 Main St'
+    with django_assert_num_queries(0):
+        response = client.get(url, {'fields': 'address'})
+    assert response.data == {'address': '1 Main St'}
+
+    # Each projection has its own ETag, the same for any spelling of the field set
+    full_etag = client.get(url)['ETag']
+    etag = client.get(url, {'fields': 'username,id'})['ETag']
+    assert etag != full_etag
+    assert etag == client.get(url, {'fields': 'id, username,id'})['ETag']
+    assert client.get(url, {'fields': 'id,username'}, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
@@ -0,0 +1,108 @@
+import base64
+import pytest
+from django.urls import reverse
+from django.test import Client
+from django.contrib.auth import get_user_model
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.views import APIView
+from users.async_views import AsyncAPIView
+from users.authentication import CachedBasicAuthentication
+
+User = get_user_model()
+
+def basic_auth(username, password):
+    token = base64.b64encode(f'{username}:{password}'.encode()).decode()
+    return {'HTTP_AUTHORIZATION': f'Basic {token}'}
+
+@pytest.mark.django_db
+def test_async_user_list():
+    User.objects.create_user(username='testuser', password='12345')
+    for i in range(3):
+        User.objects.create_user(username=f'user{i}', password='12345')
+
+    client = Client()
+    url = reverse('api_async_user_list')
+    assert client.get(url).status_code == 403
+
+    client.login(username='testuser', password='12345')
+    response = client.get(url, {'page_size': 3})
+    assert response.status_code == 200
+    data = response.json()
+    assert [u['username'] for u in data['results']] == ['testuser', 'user0', 'user1']
+    assert set(data['results'][0]) == set(('id', 'username', 'email', 'first_name', 'last_name', 'phone', 'address'))
+
+    data = client.get(data['next']).json()
+    assert [u['username'] for u in data['results']] == ['user2']
+    assert data['next'] is None
+
+    data = client.get(url, {'username': 'user'}).json()
+    assert len(data['results']) == 3
+
+@pytest.mark.django_db
+def test_async_user_detail():
+    user1 = User.objects.create_user(username='testuser1', password='12345')
+    user2 = User.objects.create_user(username='testuser2', password='12345')
+    User.objects.create_superuser(username='admin', email='admin@example.com', password='admin12345')
+
+    client = Client()
+    response = client.get(reverse('api_async_user_detail', args=[user1.id]), **basic_auth('testuser1', '12345'))
+    assert response.status_code == 200
+    assert response.json()['username'] == 'testuser1'
+
+    response = client.get(reverse('api_async_user_detail', args=[user2.id]), **basic_auth('testuser1', '12345'))
+    assert response.status_code == 403
+
+    response = client.get(reverse('api_async_user_detail', args=[user2.id]), **basic_auth('testuser1', 'wrong'))
+    assert response.status_code == 403
+
+    response = client.get(reverse('api_async_user_detail', args=[user2.id]), **basic_auth('admin', 'admin12345'))
+    assert response.status_code == 200
+
+    response = client.get(reverse('api_async_user_detail', args=[9999]), **basic_auth('admin', 'admin12345'))
+    assert response.status_code == 404
+
+@pytest.mark.django_db
+def test_async_user_registration():
+    client = Client()
+    url = reverse('api_async_register')
+    data = {
+        'username': 'testuser',
+        'password': 'testpass123',
+        'password2': 'testpass123',
+        'email': 'Test@EXAMPLE.com',
+        'first_name': 'Test',
+        'last_name': 'User'
+    }
+    response = client.post(url, data, content_type='application/json')
+    assert response.status_code == 201
+    user = User.objects.get(username='testuser')
+    assert user.email == 'Test@example.com'
+    assert user.check_password('testpass123')
+
+    response = client.post(url, data, content_type='application/json')
+    assert response.status_code == 400
+    assert 'username' in response.json()
+
+@pytest.mark.django_db
+def test_async_authentication_errors_match_sync_api(monkeypatch):
+    User.objects.create_user(username='testuser', password='12345')
+    client = Client()
+
+    def check(credentials, status_code, detail):
+        sync = client.get(reverse('api_user_list'), **credentials)
+        for url in [reverse('api_async_user_list'), reverse('api_async_user_detail', args=[1])]:
+            response = client.get(url, **credentials)
+            assert response.status_code == sync.status_code == status_code
+            assert response.get('WWW-Authenticate') == sync.get('WWW-Authenticate')
+            assert response.json()['detail'] == sync.json()['detail'] == detail
+
+    # Session authentication first: no challenge to send, so 403 like DRF
+    check({}, 403, 'Authentication credentials were not provided.')
+    check(basic_auth('testuser', 'wrong'), 403, 'Invalid username/password.')
+
+    authenticators = [CachedBasicAuthentication, SessionAuthentication]
+    monkeypatch.setattr(APIView, 'authentication_classes', authenticators)
+    monkeypatch.setattr(AsyncAPIView, 'authentication_classes', authenticators)
+    check({}, 401, 'Authentication credentials were not provided.')
+    check(basic_auth('testuser', 'wrong'), 401, 'Invalid username/password.')
+    assert client.get(reverse('api_async_user_list'))['WWW-Authenticate'] == 'Basic realm="api"'
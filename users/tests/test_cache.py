@@ -0,0 +1,104 @@
+import pytest
+from django.conf import settings
+from django.core.cache import caches
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from users.cache import (
+    _list_key, _user_version_key, cache_requests, cache_user, get_cached_user, get_user_version, invalidate_user,
+)
+
+User = get_user_model()
+
+def hits(kind):
+    return cache_requests.labels(kind=kind, result='hit')._value.get()
+
+@pytest.mark.django_db
+def test_user_detail_api_is_cached(django_assert_num_queries):
+    user = User.objects.create_user(username='testuser', password='12345')
+    other = User.objects.create_user(username='otheruser', password='12345')
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('api_user_detail', args=[user.id])
+
+    assert client.get(url).status_code == 200
+    before = hits('detail')
+    with django_assert_num_queries(0):
+        response = client.get(url)
+    assert response.data['username'] == 'testuser'
+    assert hits('detail') == before + 1
+
+    # Permissions are still checked against the cached payload
+    client.force_authenticate(user=other)
+    assert client.get(url).status_code == 403
+
+@pytest.mark.django_db(transaction=True)
+def test_user_detail_cache_invalidated_on_write():
+    user = User.objects.create_user(username='testuser', password='12345')
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('api_user_detail', args=[user.id])
+
+    client.get(url)
+    client.patch(reverse('api_user_update', args=[user.id]), {'first_name': 'Updated'})
+    assert client.get(url).data['first_name'] == 'Updated'
+
+    # A login only touches last_login and keeps the cached payload
+    client.get(url)
+    user.save(update_fields=['last_login'])
+    assert get_cached_user(user.id) is not None
+
+    user.delete()
+    assert get_cached_user(user.id) is None
+
+@pytest.mark.django_db(transaction=True)
+def test_user_list_api_cache_invalidated_on_create(django_assert_num_queries):
+    user = User.objects.create_user(username='testuser', password='12345')
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('api_user_list')
+
+    assert len(client.get(url).data) == 1
+    with django_assert_num_queries(0):
+        assert len(client.get(url).data) == 1
+
+    User.objects.create_user(username='newuser', password='12345')
+    assert len(client.get(url).data) == 2
+    # Different query strings are cached separately
+    assert len(client.get(url, {'username': 'new'}).data) == 1
+
+@pytest.mark.django_db
+def test_write_between_read_and_store_leaves_entry_unused(django_capture_on_commit_callbacks):
+    user = User.objects.create_user(username='testuser', password='12345')
+    version = get_user_version(user.id)
+    stale = {'username': 'testuser'}
+    with django_capture_on_commit_callbacks(execute=True):
+        User.objects.filter(pk=user.pk).update(username='renamed')
+        invalidate_user(user.id)
+    cache_user(user.id, stale, user.updated_at, version)
+    assert get_cached_user(user.id) is None
+
+@pytest.mark.django_db
+def test_versions_are_bumped_on_commit(django_capture_on_commit_callbacks):
+    user = User.objects.create_user(username='testuser', password='12345')
+    before = get_user_version(user.id)
+    with django_capture_on_commit_callbacks() as callbacks:
+        user.first_name = 'Updated'
+        user.save()
+        # Readers inside the write's transaction window keep the old version
+        assert get_user_version(user.id) == before
+    for callback in callbacks:
+        callback()
+    assert get_user_version(user.id) != before
+
+def test_lost_version_does_not_restart_from_an_old_value():
+    version = get_user_version(123456)
+    caches[settings.USER_VERSION_CACHE_ALIAS].delete(_user_version_key(123456))
+    assert get_user_version(123456) > version
+
+def test_list_key_ignores_unknown_parameters():
+    factory = RequestFactory()
+    url = reverse('api_user_list')
+    assert _list_key(factory.get(url, {'page_size': 2, 'junk': 1})) == _list_key(factory.get(url, {'page_size': 2}))
+    assert _list_key(factory.get(url, {'page_size': 2})) != _list_key(factory.get(url, {'page_size': 3}))
@@ -0,0 +1,75 @@
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.auth import get_user_model
+from users.importer import _pools
+
+User = get_user_model()
+
+@pytest.mark.django_db
+def test_import_users_command_ndjson(tmp_path):
+    User.objects.create_user(username='existing', password='12345')
+    path = tmp_path / 'users.ndjson'
+    path.write_text(
+        '{"username": "alice", "email": "alice@example.com", "password": "pass12345"}\n'
+        '{"username": "bob", "first_name": "Bob"}\n'
+        'not json\n'
+        '\n'
+        '{"username": "existing"}\n'
+        '{"username": "carol", "password": "pass12345"}\n'
+    )
+
+    out, err = StringIO(), StringIO()
+    call_command('import_users', str(path), '--batch-size', '2', '--workers', '2', stdout=out, stderr=err)
+
+    assert 'Imported 3 users, 2 rows rejected' in out.getvalue()
+    assert 'Row 3:' in err.getvalue()
+    assert 'Row 5:' in err.getvalue()
+    assert User.objects.get(username='alice').check_password('pass12345')
+    assert User.objects.get(username='carol').check_password('pass12345')
+    assert User.objects.get(username='bob').first_name == 'Bob'
+
+    # The hashing pool is spawned once and kept for the next import
+    pool = _pools[2]
+    path.write_text('{"username": "dave", "password": "pass12345"}\n')
+    call_command('import_users', str(path), '--workers', '2', stdout=StringIO(), stderr=StringIO())
+    assert _pools[2] is pool
+    assert pool._mp_context.get_start_method() == 'spawn'
+    assert User.objects.get(username='dave').check_password('pass12345')
+
+@pytest.mark.django_db
+def test_import_users_command_csv(tmp_path):
+    path = tmp_path / 'users.csv'
+    path.write_text('username,email,phone\nalice,alice@example.com,555-0100\nbad user!,,\n')
+
+    out, err = StringIO(), StringIO()
+    call_command('import_users', str(path), '--workers', '1', stdout=out, stderr=err)
+
+    assert 'Imported 1 users, 1 rows rejected' in out.getvalue()
+    assert 'Row 3:' in err.getvalue()
+    assert User.objects.get(username='alice').phone == '555-0100'
+
+def test_import_users_command_unknown_format(tmp_path):
+    with pytest.raises(CommandError):
+        call_command('import_users', str(tmp_path / 'users.txt'))
+
+def test_import_users_command_missing_file(tmp_path):
+    with pytest.raises(CommandError, match='Cannot open'):
+        call_command('import_users', str(tmp_path / 'missing.csv'))
+
+@pytest.mark.django_db
+def test_prune_sessions_command():
+    from datetime import timedelta
+    from django.contrib.sessions.models import Session
+    from django.utils import timezone
+    past = timezone.now() - timedelta(days=1)
+    future = timezone.now() + timedelta(days=1)
+    for i in range(5):
+        Session.objects.create(session_key=f'expired{i}', session_data='', expire_date=past)
+    Session.objects.create(session_key='active', session_data='', expire_date=future)
+
+    out = StringIO()
+    call_command('prune_sessions', '--batch-size', '2', stdout=out)
+    assert 'Deleted 5 expired sessions' in out.getvalue()
+    assert list(Session.objects.values_list('session_key', flat=True)) == ['active']
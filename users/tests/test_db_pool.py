@@ -0,0 +1,117 @@
+import threading
+import time
+import pytest
+from django.db import connection
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS, TRANSACTION_STATUS_UNKNOWN
+from users.db_pool.base import DatabaseWrapper
+from users.db_pool.pool import ConnectionPool, PoolTimeout, get_pool
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.status = TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+def make_pool(**kwargs):
+    opened = []
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+    return ConnectionPool(connect, alias='test', **kwargs), opened
+
+def test_pool_reuses_returned_connections():
+    pool, opened = make_pool()
+    first = pool.getconn()
+    first.status = TRANSACTION_STATUS_INTRANS
+    pool.putconn(first)
+    assert first.rollbacks == 1
+    assert pool.getconn() is first
+    assert len(opened) == 1
+
+def test_pool_waits_for_a_free_connection_up_to_timeout():
+    pool, opened = make_pool(max_size=1, timeout=0.05)
+    first = pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    threading.Timer(0.01, pool.putconn, [first]).start()
+    pool.timeout = 5
+    assert pool.getconn() is first
+
+def test_pool_discards_broken_connections():
+    pool, opened = make_pool()
+    broken, stale, closed = pool.getconn(), pool.getconn(), pool.getconn()
+    broken.status = TRANSACTION_STATUS_UNKNOWN
+    for connection in (broken, stale, closed):
+        pool.putconn(connection)
+    closed.closed = 1
+    assert broken.closed
+    assert [connection for connection, idle_since in pool.idle] == [stale, closed]
+
+    pool.idle[0] = (stale, time.monotonic() - pool.max_idle - 1)
+    fresh = pool.getconn()
+    assert stale.closed
+    assert fresh not in (broken, stale, closed)
+    assert len(opened) == 4
+
+def test_get_pool_is_per_key():
+    factory = lambda: make_pool()[0]  # noqa: E731
+    assert get_pool(('test', 'a'), factory) is get_pool(('test', 'a'), factory)
+    assert get_pool(('test', 'a'), factory) is not get_pool(('test', 'b'), factory)
+
+@pytest.fixture
+def pooled_connection(db):
+    if connection.vendor != 'postgresql':
+        pytest.skip('The pool backend needs PostgreSQL')
+    settings_dict = {
+        **connection.settings_dict,
+        'ENGINE': 'users.db_pool',
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {'pool': {'max_size': 1, 'timeout': 1}},
+    }
+    pooled = DatabaseWrapper(settings_dict, alias='pool_test')
+    yield pooled
+    pooled.close()
+    pooled.pool.close()
+
+def backend_pid(pooled):
+    with pooled.cursor() as cursor:
+        cursor.execute('SELECT pg_backend_pid()')
+        return cursor.fetchone()[0]
+
+def test_backend_returns_connections_to_the_pool(pooled_connection):
+    pid = backend_pid(pooled_connection)
+    pooled_connection.set_autocommit(False)
+    backend_pid(pooled_connection)
+    pooled_connection.close()
+    assert pooled_connection.connection is None
+    assert len(pooled_connection.pool.idle) == 1
+
+    # Same server session, rolled back and back in autocommit mode
+    assert backend_pid(pooled_connection) == pid
+    assert pooled_connection.get_autocommit()
+    assert pooled_connection.connection.get_transaction_status() == TRANSACTION_STATUS_IDLE
+
+def test_backend_discards_connections_closed_in_a_transaction(pooled_connection):
+    pid = backend_pid(pooled_connection)
+    pooled_connection.in_atomic_block = True
+    try:
+        pooled_connection.close()
+    finally:
+        pooled_connection.in_atomic_block = False
+    assert pooled_connection.closed_in_transaction
+    assert not pooled_connection.pool.idle
+    pooled_connection.connection = None
+    pooled_connection.closed_in_transaction = False
+
+    # The slot was released, so the single-connection pool opens a new one
+    assert backend_pid(pooled_connection) != pid
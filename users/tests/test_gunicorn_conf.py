@@ -0,0 +1,52 @@
+import os
+import runpy
+from pathlib import Path
+import pytest
+
+CONFIG = Path(__file__).resolve().parents[2] / 'gunicorn.conf.py'
+
+@pytest.fixture
+def load_config(monkeypatch, tmp_path):
+    monkeypatch.setattr(os, 'sched_getaffinity', lambda pid: {0, 1}, raising=False)
+    for name in list(os.environ):
+        if name.startswith('GUNICORN_'):
+            monkeypatch.delenv(name)
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+
+    def load(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        return runpy.run_path(str(CONFIG))
+    return load
+
+def test_uvicorn_defaults(load_config):
+    config = load_config()
+    assert config['worker_class'] == 'uvicorn.workers.UvicornWorker'
+    assert config['wsgi_app'] == 'user_directory.asgi:application'
+    assert config['threads'] == 1
+    assert config['workers'] == 5
+    assert config['preload_app'] is True
+    assert config['max_requests_jitter'] == config['max_requests'] // 10
+    for hook in ('on_starting', 'when_ready', 'post_fork', 'child_exit'):
+        assert callable(config[hook])
+
+def test_gthread_and_overrides(load_config):
+    config = load_config(GUNICORN_WORKER_CLASS='gthread', GUNICORN_PRELOAD='false', GUNICORN_MAX_REQUESTS='100')
+    assert config['wsgi_app'] == 'user_directory.wsgi:application'
+    assert config['threads'] == 4
+    assert config['workers'] == 3
+    assert config['preload_app'] is False
+    assert config['max_requests_jitter'] == 10
+    assert load_config(GUNICORN_WORKERS='7')['workers'] == 7
+
+def test_loading_keeps_metrics_until_on_starting(load_config, tmp_path):
+    stale = tmp_path / 'counter_999999999.db'
+    own = tmp_path / f'counter_{os.getpid()}.db'
+    stale.touch()
+    own.touch()
+    config = load_config()
+    assert stale.exists()
+
+    config['on_starting'](None)
+    assert not stale.exists()
+    assert own.exists()
@@ -0,0 +1,92 @@
+import json
+import logging
+import threading
+from users.log_handlers import JSONFormatter, QueuedHandler, log_records_blocked, log_records_dropped
+
+class RecordingHandler(logging.Handler):
+    def __init__(self, gate=None):
+        super().__init__()
+        self.gate = gate
+        self.records = []
+        self.flushes = 0
+
+    def emit(self, record):
+        if self.gate is not None:
+            self.gate.wait()
+        self.records.append(record)
+
+    def flush(self):
+        self.flushes += 1
+
+def make_logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger
+
+def test_queued_handler_writes_in_background():
+    target = RecordingHandler()
+    handler = QueuedHandler([target])
+    logger = make_logger('test_queued_handler', handler)
+
+    items = ['a']
+    logger.info("Items: %s", items)
+    items.append('b')
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        logger.exception("Failed")
+    handler.stop()
+
+    assert [record.getMessage() for record in target.records] == ["Items: ['a']", 'Failed']
+    assert 'ValueError: boom' in target.records[1].exc_text
+    assert target.flushes >= 1
+
+def test_queued_handler_respects_target_levels():
+    info, errors = RecordingHandler(), RecordingHandler()
+    errors.setLevel(logging.ERROR)
+    handler = QueuedHandler([info, errors])
+    logger = make_logger('test_queued_handler_levels', handler)
+
+    logger.info('info')
+    logger.error('error')
+    handler.stop()
+
+    assert [record.getMessage() for record in info.records] == ['info', 'error']
+    assert [record.getMessage() for record in errors.records] == ['error']
+
+def test_queued_handler_drops_when_full():
+    gate = threading.Event()
+    target = RecordingHandler(gate=gate)
+    handler = QueuedHandler([target], maxsize=1, block_timeout=0.01)
+    logger = make_logger('test_queued_handler_full', handler)
+    dropped = log_records_dropped.labels(level='INFO')._value.get()
+    blocked = log_records_blocked.labels(level='ERROR')._value.get()
+
+    logger.info('taken by the writer thread')
+    while not handler.queue.empty():
+        pass
+    logger.info('queued')
+    logger.info('dropped')
+    logger.error('waits, then dropped')
+    assert log_records_dropped.labels(level='INFO')._value.get() == dropped + 1
+    assert log_records_blocked.labels(level='ERROR')._value.get() == blocked + 1
+
+    gate.set()
+    handler.stop()
+    assert [record.getMessage() for record in target.records] == ['taken by the writer thread', 'queued']
+
+def test_queued_handler_from_settings():
+    handler, = logging.getLogger('django').handlers
+    assert isinstance(handler, QueuedHandler)
+    assert [type(target).__name__ for target in handler.targets] == [
+        'StreamHandler', 'BatchedRotatingFileHandler', 'BatchedRotatingFileHandler',
+    ]
+
+def test_json_formatter():
+    record = logging.LogRecord('users.views', logging.WARNING, __file__, 1, 'User %s failed', ('alice',), None)
+    entry = json.loads(JSONFormatter().format(record))
+    assert entry['level'] == 'WARNING'
+    assert entry['logger'] == 'users.views'
+    assert entry['message'] == 'User alice failed'
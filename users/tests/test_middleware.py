@@ -0,0 +1,64 @@
+import logging
+import pytest
+from asgiref.sync import async_to_sync
+from django.urls import reverse
+from django.core.handlers.asgi import ASGIHandler
+from django.test import AsyncClient, Client
+from django.contrib.auth import get_user_model
+from users.middleware import view_db_queries
+
+User = get_user_model()
+
+def observed(view):
+    return view_db_queries.labels(view=view)._sum.get()
+
+@pytest.mark.django_db
+def test_query_instrumentation_server_timing():
+    User.objects.create_user(username='testuser', password='12345')
+    client = Client()
+    client.login(username='testuser', password='12345')
+
+    before = observed('user_list')
+    response = client.get(reverse('user_list'))
+    assert response.status_code == 200
+    assert response['Server-Timing'].startswith('db;dur=')
+    assert 'queries"' in response['Server-Timing']
+    assert observed('user_list') > before
+
+@pytest.mark.django_db
+def test_query_instrumentation_warns_above_threshold(settings, caplog):
+    settings.QUERY_COUNT_WARNING_THRESHOLD = 1
+    User.objects.create_user(username='testuser', password='12345')
+    client = Client()
+    client.login(username='testuser', password='12345')
+
+    with caplog.at_level(logging.WARNING, logger='users.middleware'):
+        client.get(reverse('user_list'))
+    assert any('Possible N+1 in user_list' in record.getMessage() for record in caplog.records)
+
+def test_asgi_handler_needs_no_middleware_adaptation(settings, caplog):
+    # Adaptations are only logged in debug mode, and the 'django' logger does not propagate to caplog
+    settings.DEBUG = True
+    logger = logging.getLogger('django.request')
+    logger.addHandler(caplog.handler)
+    try:
+        with caplog.at_level(logging.DEBUG, logger='django.request'):
+            ASGIHandler()
+    finally:
+        logger.removeHandler(caplog.handler)
+    assert [record.getMessage() for record in caplog.records if 'adapted for middleware' in record.getMessage()] == []
+
+@pytest.mark.django_db
+def test_query_instrumentation_under_asgi():
+    User.objects.create_user(username='testuser', password='12345')
+    client = AsyncClient()
+    client.force_login(User.objects.get(username='testuser'))
+
+    async def get():
+        return await client.get(reverse('user_list'))
+
+    before = observed('user_list')
+    response = async_to_sync(get)()
+    assert response.status_code == 200
+    assert 'desc="0 queries"' not in response['Server-Timing']
+    assert observed('user_list') > before
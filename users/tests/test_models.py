@@ -34,3 +34,61 @@ def test_create_superuser():
 def test_debug_setting(debug_value):
     settings.DEBUG = debug_value
     assert settings.DEBUG == debug_value
+
+@pytest.mark.django_db
+def test_outdated_password_hash_is_upgraded_after_login(settings):
+    user = User.objects.create_user(username='testuser', password='testpass123')
+    assert user.password.startswith('pbkdf2_sha256$')
+
+    settings.PASSWORD_HASHERS = ['users.hashers.TunedScryptPasswordHasher', 'users.hashers.TunedPBKDF2PasswordHasher']
+    settings.PASSWORD_REHASH_WORKERS = 0
+    assert user.check_password('testpass123')
+    user.refresh_from_db()
+    assert user.password.startswith('scrypt$')
+    assert user.check_password('testpass123')
+
+@pytest.mark.django_db
+def test_password_rehash_runs_off_the_request_path(settings, monkeypatch):
+    user = User.objects.create_user(username='testuser', password='testpass123')
+    settings.PASSWORD_PBKDF2_ITERATIONS = 1000
+    submitted = []
+    monkeypatch.setattr('users.hashers.get_executor', lambda: type('Executor', (), {
+        'try_submit': staticmethod(lambda *args: submitted.append(args) or args),
+    }))
+
+    assert user.check_password('testpass123')
+    assert len(submitted) == 1
+    # Nothing was written during the check itself
+    assert User.objects.get(pk=user.pk).password == user.password
+
+def test_rehash_executor_drops_work_when_full():
+    import threading
+    from users.hashers import BoundedThreadPoolExecutor
+
+    gate = threading.Event()
+    executor = BoundedThreadPoolExecutor(1, 2)
+    running = executor.try_submit(gate.wait)
+    queued = executor.try_submit(gate.wait)
+    assert executor.try_submit(gate.wait) is None
+
+    gate.set()
+    running.result()
+    queued.result()
+    # Finished tasks free their slots
+    assert executor.try_submit(lambda: 'done').result() == 'done'
+    executor.shutdown()
+
+@pytest.mark.django_db
+def test_password_rehash_is_dropped_when_queue_is_full(settings, monkeypatch):
+    from users.hashers import password_rehashes_dropped
+
+    user = User.objects.create_user(username='testuser', password='testpass123')
+    settings.PASSWORD_PBKDF2_ITERATIONS = 1000
+    monkeypatch.setattr('users.hashers.get_executor', lambda: type('Executor', (), {
+        'try_submit': staticmethod(lambda *args: None),
+    }))
+    dropped = password_rehashes_dropped._value.get()
+
+    assert user.check_password('testpass123')
+    assert password_rehashes_dropped._value.get() == dropped + 1
+    assert User.objects.get(pk=user.pk).password == user.password
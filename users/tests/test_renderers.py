@@ -0,0 +1,43 @@
+import io
+import json
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from users.renderers import ORJSONParser, ORJSONRenderer
+from users.serializers import UserSerializer
+
+User = get_user_model()
+
+@pytest.mark.django_db
+def test_orjson_renderer_matches_stdlib_renderer():
+    User.objects.create_user(username='testuser', password='12345', first_name='Zoë', address='1 Main St')
+    User.objects.create_user(username='another', password='12345')
+    data = {
+        'results': UserSerializer(User.objects.order_by('id'), many=True).data,
+        'detail': ErrorDetail('Invalid input.', code='invalid'),
+        'message': gettext_lazy('Not found.'),
+        'created': datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+        'amount': Decimal('1.50'),
+        'token': uuid.UUID(int=1),
+        1: 'integer key',
+    }
+    assert json.loads(ORJSONRenderer().render(data)) == json.loads(JSONRenderer().render(data))
+    assert ORJSONRenderer().render(None) == b''
+    assert b'\n  ' in ORJSONRenderer().render({'a': 1}, 'application/json; indent=4')
+
+def test_orjson_renderer_writes_non_finite_floats_as_null():
+    assert ORJSONRenderer().render({'value': float('nan')}) == b'{"value":null}'
+    with pytest.raises(ValueError):
+        JSONRenderer().render({'value': float('nan')})
+
+def test_orjson_parser():
+    body = '{"username": "zoë", "ids": [1, 2]}'.encode()
+    assert ORJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(io.BytesIO(body))
+    with pytest.raises(ParseError):
+        ORJSONParser().parse(io.BytesIO(b'{"username": '))
@@ -0,0 +1,111 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import reverse
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+from users.routers import _state
+
+User = get_user_model()
+
+REPLICA = 'replica'
+
+@pytest.fixture(scope='module')
+def replica_database(django_db_setup, django_db_blocker, tmp_path_factory):
+    """A separate SQLite database standing in for a lagging replica of the test database."""
+    replica = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(tmp_path_factory.mktemp('replica') / 'db.sqlite3')}
+    connections.configure_settings({DEFAULT_DB_ALIAS: connections.settings[DEFAULT_DB_ALIAS], REPLICA: replica})
+    connections.settings[REPLICA] = replica
+    with django_db_blocker.unblock():
+        with connections[REPLICA].schema_editor() as editor:
+            editor.create_model(User)
+    yield
+    connections[REPLICA].close()
+    del connections[REPLICA]
+    del connections.settings[REPLICA]
+
+@pytest.fixture
+def replica(replica_database, settings):
+    settings.DATABASE_REPLICAS = [REPLICA]
+
+def copy_to_replica(user, **changes):
+    User.objects.using(REPLICA).filter(pk=user.pk).delete()
+    values = {field.attname: getattr(user, field.attname) for field in User._meta.concrete_fields}
+    User.objects.using(REPLICA).bulk_create([User(**{**values, **changes})])
+
+@pytest.mark.django_db(databases=[DEFAULT_DB_ALIAS, REPLICA])
+def test_reads_use_replica_until_own_write(replica, django_capture_on_commit_callbacks):
+    user = User.objects.create_user(username='testuser', password='12345', first_name='Primary')
+    copy_to_replica(user, first_name='Stale')
+    client = APIClient()
+    client.force_authenticate(user=user)
+    detail = reverse('api_user_detail', kwargs={'pk': user.pk})
+
+    assert client.get(detail).data['first_name'] == 'Stale'
+    assert client.get(reverse('api_user_list'), {'fields': 'first_name'}).data == [{'first_name': 'Stale'}]
+
+    # Caches are invalidated once the write commits
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.patch(reverse('api_user_update', kwargs={'pk': user.pk}), {'first_name': 'Updated'}, format='json')
+    assert response.status_code == 200
+    assert response.cookies['primary_pin']['max-age'] == 10
+
+    # Other clients still read the lagging replica, but do not cache what they
+    # read right after a write, so the pinned client sees its update
+    other = APIClient()
+    other.force_authenticate(user=user)
+    assert other.get(detail).data['first_name'] == 'Stale'
+    assert client.get(detail).data['first_name'] == 'Updated'
+
+@pytest.mark.django_db(databases=[DEFAULT_DB_ALIAS, REPLICA])
+def test_form_update_pins_to_primary(client, replica, django_capture_on_commit_callbacks):
+    user = User.objects.create_user(username='testuser', password='12345', email='test@example.com')
+    copy_to_replica(user, first_name='Stale')
+    client.force_login(user)
+
+    response = client.get(reverse('user_detail', kwargs={'pk': user.pk}))
+    assert response.context['user'].first_name == 'Stale'
+    assert 'primary_pin' not in response.cookies
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(reverse('user_update', kwargs={'pk': user.pk}), {
+            'first_name': 'Updated', 'last_name': '', 'email': 'test@example.com', 'phone': '', 'address': '',
+        })
+    assert response.status_code == 302
+    assert 'primary_pin' in response.cookies
+    response = client.get(reverse('user_detail', kwargs={'pk': user.pk}))
+    assert response.context['user'].first_name == 'Updated'
+
+@pytest.mark.django_db(databases=[DEFAULT_DB_ALIAS, REPLICA])
+def test_login_does_not_pin_to_primary(client, replica):
+    user = User.objects.create_user(username='testuser', password='12345')
+
+    response = client.post(reverse('login'), {'username': 'testuser', 'password': '12345'})
+    assert response.status_code == 302
+    assert 'primary_pin' not in response.cookies
+    user.refresh_from_db()
+    assert user.last_login is not None
+
+@pytest.mark.django_db(databases=[DEFAULT_DB_ALIAS, REPLICA])
+def test_pin_under_asgi(replica, django_capture_on_commit_callbacks):
+    user = User.objects.create_user(username='testuser', password='12345', email='test@example.com')
+    copy_to_replica(user, first_name='Stale')
+    client = AsyncClient()
+    client.force_login(user)
+
+    async def update():
+        return await client.post(reverse('user_update', kwargs={'pk': user.pk}), {
+            'first_name': 'Updated', 'last_name': '', 'email': 'test@example.com', 'phone': '', 'address': '',
+        })
+
+    async def detail():
+        return await client.get(reverse('user_detail', kwargs={'pk': user.pk}))
+
+    assert async_to_sync(detail)().context['user'].first_name == 'Stale'
+    with django_capture_on_commit_callbacks(execute=True):
+        response = async_to_sync(update)()
+    assert response.status_code == 302
+    assert 'primary_pin' in response.cookies
+    assert async_to_sync(detail)().context['user'].first_name == 'Updated'
+    assert _state.get() is None
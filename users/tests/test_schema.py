@@ -0,0 +1,47 @@
+import json
+from io import StringIO
+import subprocess
+import sys
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from users.schema import load_schema
+
+@pytest.fixture
+def schema_dir(settings, tmp_path):
+    settings.OPENAPI_SCHEMA_DIR = str(tmp_path)
+    load_schema.cache_clear()
+    yield tmp_path
+    load_schema.cache_clear()
+
+@pytest.mark.django_db
+def test_prebuilt_schema_is_served_with_caching_headers(client, schema_dir):
+    call_command('build_openapi_schema', stdout=StringIO())
+    url = reverse('schema-json', args=['.json'])
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == (schema_dir / 'openapi.json').read_bytes()
+    assert 'max-age=86400' in response['Cache-Control'] and 'public' in response['Cache-Control']
+    schema = json.loads(response.content)
+    assert 'Retrieve several users' in schema['paths']['/users/batch/']['get']['description']
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == 304
+    assert (schema_dir / 'openapi.yaml').exists()
+
+@pytest.mark.django_db
+def test_docs_pages_load_the_prebuilt_schema(client, schema_dir):
+    for name in ('schema-swagger-ui', 'schema-redoc'):
+        response = client.get(reverse(name))
+        assert response.status_code == 200
+        assert b'/swagger.json' in response.content
+
+def test_api_modules_do_not_import_drf_yasg():
+    code = (
+        'import sys, django; django.setup(); '
+        'import user_directory.urls, users.views; '
+        'print(sorted(name for name in sys.modules if name.startswith("drf_yasg.")))'
+    )
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == '[]'
@@ -0,0 +1,63 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.throttling import SimpleRateThrottle
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from users.throttling import SlidingWindowScopedRateThrottle
+
+User = get_user_model()
+
+class ScopedView:
+    throttle_scope = 'login'
+
+def make_throttle(monkeypatch, now):
+    monkeypatch.setattr(SlidingWindowScopedRateThrottle, 'THROTTLE_RATES', {'login': '10/min'})
+    throttle = SlidingWindowScopedRateThrottle()
+    throttle.timer = lambda: now[0]
+    return throttle
+
+def anonymous_request(address):
+    request = APIRequestFactory().get('/', REMOTE_ADDR=address)
+    request.user = AnonymousUser()
+    return request
+
+def test_sliding_window_weights_previous_window(monkeypatch):
+    now = [6000.0]
+    request = anonymous_request('10.0.0.1')
+    throttle = make_throttle(monkeypatch, now)
+
+    assert all(throttle.allow_request(request, ScopedView()) for _ in range(10))
+    assert not throttle.allow_request(request, ScopedView())
+    assert 0 < throttle.wait() <= 60
+
+    # Halfway through the next window half of the previous count still applies
+    now[0] += 90
+    assert all(throttle.allow_request(request, ScopedView()) for _ in range(5))
+    assert not throttle.allow_request(request, ScopedView())
+
+    # Other clients have their own counters
+    other = anonymous_request('10.0.0.2')
+    assert throttle.allow_request(other, ScopedView())
+
+    # Two windows later the old counts no longer matter
+    now[0] += 120
+    assert all(throttle.allow_request(request, ScopedView()) for _ in range(10))
+
+@pytest.mark.django_db
+def test_login_has_its_own_scope(monkeypatch):
+    monkeypatch.setattr(SimpleRateThrottle, 'THROTTLE_RATES', {**SimpleRateThrottle.THROTTLE_RATES, 'login': '2/hour'})
+    User.objects.create_user(username='testuser', password='12345')
+    client = APIClient()
+    data = {'username': 'testuser', 'password': '12345'}
+
+    assert client.post(reverse('api_login'), data).status_code == 200
+    assert client.post(reverse('api_login'), data).status_code == 200
+    response = client.post(reverse('api_login'), data)
+    assert response.status_code == 429
+    assert 'Retry-After' in response
+
+    # Registration is limited separately
+    registration = {'username': 'newuser', 'password': 'Xy7!testpass', 'password2': 'Xy7!testpass',
+                    'email': 'new@example.com'}
+    assert client.post(reverse('api_register'), registration).status_code == 201
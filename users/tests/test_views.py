@@ -1,5 +1,7 @@
 import pytest
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.test import Client
 
@@ -27,6 +29,44 @@ def test_user_list_view():
     assert 'users' in response.context
     assert all(isinstance(u, User) for u in response.context['users'])
 
+@pytest.mark.django_db
+def test_user_list_view_pagination(settings):
+    settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK, 'PAGE_SIZE': 2}
+    User.objects.create_superuser(username='admin', email='admin@example.com', password='admin12345')
+    for i in range(3):
+        User.objects.create_user(username=f'user{i}', password='12345')
+
+    client = Client()
+    client.login(username='admin', password='admin12345')
+    response = client.get(reverse('user_list'))
+    assert [u.username for u in response.context['users']] == ['admin', 'user0']
+    assert response.context['previous_page_url'] is None
+
+    response = client.get(response.context['next_page_url'])
+    assert [u.username for u in response.context['users']] == ['user1', 'user2']
+
+    response = client.get(reverse('user_list'), {'cursor': 'not-a-cursor'})
+    assert response.status_code == 404
+
+@pytest.mark.django_db
+def test_user_list_view_cached_page_skips_the_query():
+    user = User.objects.create_user(username='testuser', password='12345')
+    User.objects.create_user(username='other', password='12345')
+    client = Client()
+    client.login(username='testuser', password='12345')
+
+    with CaptureQueriesContext(connection) as first:
+        response = client.get(reverse('user_list'))
+    with CaptureQueriesContext(connection) as second:
+        cached = client.get(reverse('user_list'))
+    assert cached.content == response.content
+    assert b'testuser (You)' in cached.content
+    assert len(second) == len(first) - 1
+
+    # Another viewer gets their own rendering
+    client.login(username='other', password='12345')
+    assert b'other (You)' in client.get(reverse('user_list')).content
+
 @pytest.mark.django_db
 def test_user_detail_view():
     user1 = User.objects.create_user(username='testuser1', password='12345')
@@ -99,3 +139,42 @@ def test_user_update_view():
     client.login(username='admin', password='admin12345')
     response = client.get(reverse('user_update', args=[user.id]))
     assert response.status_code == 200
+
+@pytest.mark.django_db
+def test_anonymous_page_views_create_no_session():
+    from django.contrib.sessions.models import Session
+    client = Client()
+    for name in ('home', 'login', 'register'):
+        response = client.get(reverse(name))
+        assert response.status_code == 200
+        assert 'sessionid' not in response.cookies
+        assert b'data-color-seed="' in response.content
+    assert Session.objects.count() == 0
+
+@pytest.mark.django_db
+def test_color_seed_is_stable_per_user():
+    User.objects.create_user(username='testuser', password='12345')
+    client = Client()
+    client.login(username='testuser', password='12345')
+    first = client.get(reverse('home')).context['color_seed']()
+    second = client.get(reverse('user_list')).context['color_seed']()
+    assert first == second
+    assert 1 <= first <= 1000000
+
+@pytest.mark.django_db(transaction=True)
+def test_user_list_view_projection_and_fragment_cache():
+    user = User.objects.create_user(username='testuser', password='12345')
+    client = Client()
+    client.login(username='testuser', password='12345')
+    url = reverse('user_list')
+
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(url)
+    list_queries = [query['sql'] for query in captured if 'ORDER BY' in query['sql']]
+    assert list_queries and all('password' not in sql and 'address' not in sql for sql in list_queries)
+    assert b'testuser (You)' in response.content
+
+    # Any user change bumps the list version, so the cached page is not reused
+    user.username = 'renamed'
+    user.save()
+    assert b'renamed (You)' in client.get(url).content
@@ -0,0 +1,78 @@
+"""
+Sliding-window rate limiting on shared cache counters.
+
+DRF's ``SimpleRateThrottle`` keeps a list of request timestamps per client and
+rewrites it on every check. Here each client has one integer counter per fixed
+window (the rate's period), bumped with an atomic ``incr``. The request count
+over the last period is estimated from the current and the previous window:
+
+    previous * (1 - elapsed / period) + current
+
+so a check costs a constant number of cache operations and two small keys,
+whatever the rate. Counters live in ``THROTTLE_CACHE_ALIAS``, which must be
+shared (Redis) for limits to hold across gunicorn workers.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import AnonRateThrottle, ScopedRateThrottle, SimpleRateThrottle, UserRateThrottle
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE_ALIAS]
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        window, self.elapsed = divmod(self.timer(), self.duration)
+        current_key = f'{self.key}:{int(window)}'
+        # The counter must outlive its own window to serve as the next one's "previous"
+        self.cache.add(current_key, 0, timeout=2 * self.duration)
+        try:
+            self.current = self.cache.incr(current_key)
+        except ValueError:
+            # Evicted between add() and incr()
+            self.cache.set(current_key, 1, timeout=2 * self.duration)
+            self.current = 1
+        self.previous = self.cache.get(f'{self.key}:{int(window) - 1}', 0)
+
+        if self.estimate() > self.num_requests:
+            # Rejected requests do not count against the client
+            try:
+                self.cache.decr(current_key)
+            except ValueError:
+                pass
+            self.current -= 1
+            return self.throttle_failure()
+        return self.throttle_success()
+
+    def estimate(self):
+        return self.previous * (1 - self.elapsed / self.duration) + self.current
+
+    def throttle_success(self):
+        return True
+
+    def wait(self):
+        remaining = self.duration - self.elapsed
+        if self.current + 1 > self.num_requests or not self.previous:
+            return remaining
+        # Time until the previous window's weighted share leaves room for one more request
+        needed = self.duration * (1 - (self.num_requests - self.current - 1) / self.previous) - self.elapsed
+        return max(0, min(needed, remaining))
+
+
+class SlidingWindowAnonRateThrottle(AnonRateThrottle, SlidingWindowRateThrottle):
+    pass
+
+
+class SlidingWindowUserRateThrottle(UserRateThrottle, SlidingWindowRateThrottle):
+    pass
+
+
+class SlidingWindowScopedRateThrottle(ScopedRateThrottle, SlidingWindowRateThrottle):
+    """Per-endpoint limits: the view sets ``throttle_scope`` and the rate lives in DEFAULT_THROTTLE_RATES."""
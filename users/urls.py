@@ -1,6 +1,6 @@
 from django.urls import path
 from django.contrib.auth.views import LogoutView
-from . import views
+from . import views, async_views
 
 urlpatterns = [
     # Template URLs
@@ -16,6 +16,15 @@ urlpatterns = [
     path('api/register/', views.APIUserRegistrationView.as_view(), name='api_register'),
     path('api/login/', views.APIUserLoginView.as_view(), name='api_login'),
     path('api/users/', views.APIUserListView.as_view(), name='api_user_list'),
+    path('api/users/import/', views.APIUserBulkImportView.as_view(), name='api_user_import'),
+    path('api/users/export/', views.APIUserExportView.as_view(), name='api_user_export'),
+    path('api/users/bulk/', views.APIUserBulkUpdateView.as_view(), name='api_user_bulk_update'),
+    path('api/users/batch/', views.APIUserBatchView.as_view(), name='api_user_batch'),
     path('api/users/<int:pk>/', views.APIUserDetailView.as_view(), name='api_user_detail'),
     path('api/users/update/<int:pk>/', views.APIUserUpdateView.as_view(), name='api_user_update'),
+
+    # Async API URLs (ASGI)
+    path('api/async/register/', async_views.AsyncUserRegistrationView.as_view(), name='api_async_register'),
+    path('api/async/users/', async_views.AsyncUserListView.as_view(), name='api_async_user_list'),
+    path('api/async/users/<int:pk>/', async_views.AsyncUserDetailView.as_view(), name='api_async_user_detail'),
 ]
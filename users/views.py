@@ -1,4 +1,5 @@
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
 from django.contrib.auth import login, authenticate
 from rest_framework import generics, permissions, status
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -6,6 +7,19 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from .serializers import UserRegistrationSerializer, CustomTokenObtainPairSerializer, UserSerializer
 from django.contrib.auth import get_user_model
 from .permissions import IsAdminUser, IsOwnerOrAdmin, CanViewProfile, IsAuthenticatedWithUnauthorizedResponse
+from .pagination import UserCursorPagination
+from .filters import UserSearchFilter
+from .export import EXPORT_FORMATS
+from .importer import check_encoding, detect_format, import_users, read_rows
+from .bulk import bulk_update_users
+from .conditional import ConditionalUpdateMixin
+from .fieldsets import SparseFieldsMixin
+from .throttling import SlidingWindowScopedRateThrottle
+from .cache import (
+    CachedListMixin, CachedRetrieveMixin, cache_list_page, cache_user, get_cached_list_page, get_cached_user,
+    get_list_version, get_user_version, user_from_payload,
+)
+from .routers import ReplicaReadMixin, replica_reads
 from django.contrib.auth.decorators import login_required
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -13,15 +27,16 @@ from django.urls import reverse_lazy
 from .forms import UserRegistrationForm, UserLoginForm
 from django.contrib.auth.views import LoginView
 from django.core.exceptions import PermissionDenied
-from django.http import Http404, JsonResponse
-import random
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 import logging
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
-from rest_framework.authentication import SessionAuthentication, BasicAuthentication
-from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+from rest_framework.request import Request
+from rest_framework.exceptions import NotFound
+from django.conf import settings
+from django.db import IntegrityError
+import codecs
+from .schema import openapi, swagger_auto_schema
 from django.views import View
 
 
@@ -29,19 +44,13 @@ User = get_user_model()
 
 logger = logging.getLogger(__name__)
 
-def add_color_seed(request):
-    if 'color_seed' not in request.session:
-        request.session['color_seed'] = random.randint(1, 1000000)
+# Largest value of a bigint primary key
+MAX_ID = 2 ** 63 - 1
 
-class BaseView:
-    def dispatch(self, request, *args, **kwargs):
-        add_color_seed(request)
-        return super().dispatch(request, *args, **kwargs)
-
-class HomePageView(BaseView, TemplateView):
+class HomePageView(TemplateView):
     template_name = 'home.html'
 
-class UserRegistrationView(BaseView, CreateView):
+class UserRegistrationView(CreateView):
     template_name = 'users/register.html'
     form_class = UserRegistrationForm
     success_url = reverse_lazy('login')
@@ -62,7 +71,7 @@ class UserRegistrationView(BaseView, CreateView):
             return JsonResponse(form.errors, status=400)
         return render(request, self.template_name, {'form': form})
 
-class UserLoginView(BaseView, LoginView):
+class UserLoginView(LoginView):
     template_name = 'users/login.html'
     form_class = UserLoginForm
 
@@ -85,30 +94,63 @@ class UserLoginView(BaseView, LoginView):
             return JsonResponse({'error': 'Invalid credentials'}, status=400)
         return render(request, self.template_name, {'form': form})
 
-class UserListView(BaseView, LoginRequiredMixin, ListView):
+class UserListView(LoginRequiredMixin, ReplicaReadMixin, ListView):
     model = User
     template_name = 'users/user_list.html'
+    page_template_name = 'users/user_list_page.html'
     context_object_name = 'users'
 
+    def get_queryset(self):
+        # The template only shows id and username; non-admin users get plain rows
+        queryset = super().get_queryset()
+        if self.request.user.is_staff:
+            return queryset.only('id', 'username')
+        return queryset.values('id', 'username')
+
+    def get_page_html(self):
+        """The rendered page, from the cache when possible; only a miss queries the users."""
+        viewer_id = None if self.request.user.is_staff else self.request.user.id
+        version = get_list_version()
+        html = get_cached_list_page(self.request, viewer_id, version)
+        if html is not None:
+            return html
+        # Always paginate the HTML list by keyset, never by OFFSET
+        pagination = UserCursorPagination(opt_in=False)
+        try:
+            users = pagination.paginate_queryset(self.object_list, Request(self.request), view=self)
+        except NotFound:
+            raise Http404("Invalid page cursor.")
+        html = render_to_string(self.page_template_name, {
+            'users': users,
+            'next_page_url': pagination.get_next_link(),
+            'previous_page_url': pagination.get_previous_link(),
+        }, request=self.request)
+        cache_list_page(self.request, viewer_id, html, version)
+        return html
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        if not self.request.user.is_staff:
-            # For non-admin users, limit the information
-            context['users'] = [{'id': user.id, 'username': user.username} for user in context['users']]
+        context['user_list_page'] = self.get_page_html()
         return context
 
-class UserDetailView(BaseView, LoginRequiredMixin, DetailView):
+class UserDetailView(LoginRequiredMixin, ReplicaReadMixin, DetailView):
     model = User
     template_name = 'users/user_detail.html'
     context_object_name = 'user'
 
     def get_object(self, queryset=None):
-        obj = super().get_object(queryset)
+        version = get_user_version(self.kwargs['pk'])
+        entry = get_cached_user(self.kwargs['pk'], version)
+        if entry is None:
+            obj = super().get_object(queryset)
+            cache_user(obj.pk, UserSerializer(obj).data, obj.updated_at, version)
+        else:
+            obj = user_from_payload(entry['data'])
         if not CanViewProfile().has_object_permission(self.request, self, obj):
             raise PermissionDenied("You don't have permission to view this profile.")
         return obj
 
-class UserUpdateView(BaseView, LoginRequiredMixin, UpdateView):
+class UserUpdateView(LoginRequiredMixin, UpdateView):
     model = User
     template_name = 'users/user_update.html'
     fields = ['first_name', 'last_name', 'email', 'phone', 'address']
@@ -117,32 +159,33 @@ class UserUpdateView(BaseView, LoginRequiredMixin, UpdateView):
     def get_object(self, queryset=None):
         obj = super().get_object(queryset)
         if not IsOwnerOrAdmin().has_object_permission(self.request, self, obj):
-            logger.warning(f"User {self.request.user.username} attempted to update unauthorized profile: {obj.username}")
+            logger.warning("User %s attempted to update unauthorized profile: %s",
+                           self.request.user.username, obj.username)
             raise PermissionDenied
         return obj
 
     def form_valid(self, form):
         response = super().form_valid(form)
-        logger.info(f"User {self.object.username} updated their profile")
+        logger.info("User %s updated their profile", self.object.username)
         return response
 
 @login_required
 def user_profile(request):
-    add_color_seed(request)
-    logger.debug(f"User {request.user.username} accessed their profile")
+    logger.debug("User %s accessed their profile", request.user.username)
     return render(request, 'users/user_detail.html', {'user': request.user})
 
-class AdminUserListView(generics.ListCreateAPIView):
+class AdminUserListView(CachedListMixin, generics.ListCreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny]  # Allow anyone to register
+    filter_backends = [UserSearchFilter]
 
     @swagger_auto_schema(
         operation_description="List all users or create a new user",
         responses={200: UserSerializer(many=True), 201: UserSerializer()}
     )
     def get(self, request, *args, **kwargs):
-        logger.info(f"Admin user list accessed by {request.user.username}")
+        logger.info("Admin user list accessed by %s", request.user.username)
         return super().get(request, *args, **kwargs)
 
     @swagger_auto_schema(
@@ -151,10 +194,10 @@ class AdminUserListView(generics.ListCreateAPIView):
         responses={201: UserSerializer()}
     )
     def post(self, request, *args, **kwargs):
-        logger.info(f"New user creation attempted by {request.user.username}")
+        logger.info("New user creation attempted by %s", request.user.username)
         return super().post(request, *args, **kwargs)
 
-class AdminUserDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AdminUserDetailView(CachedRetrieveMixin, ConditionalUpdateMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsOwnerOrAdmin]
@@ -164,7 +207,7 @@ class AdminUserDetailView(generics.RetrieveUpdateDestroyAPIView):
         responses={200: UserSerializer(), 403: "Forbidden", 404: "Not Found"}
     )
     def get(self, request, *args, **kwargs):
-        logger.info(f"User detail accessed for user ID {kwargs.get('pk')} by {request.user.username}")
+        logger.info("User detail accessed for user ID %s by %s", kwargs.get('pk'), request.user.username)
         return super().get(request, *args, **kwargs)
 
     @swagger_auto_schema(
@@ -173,7 +216,7 @@ class AdminUserDetailView(generics.RetrieveUpdateDestroyAPIView):
         responses={200: UserSerializer(), 400: "Bad Request", 403: "Forbidden", 404: "Not Found"}
     )
     def put(self, request, *args, **kwargs):
-        logger.info(f"User update attempted for user ID {kwargs.get('pk')} by {request.user.username}")
+        logger.info("User update attempted for user ID %s by %s", kwargs.get('pk'), request.user.username)
         return super().put(request, *args, **kwargs)
 
     @swagger_auto_schema(
@@ -182,7 +225,7 @@ class AdminUserDetailView(generics.RetrieveUpdateDestroyAPIView):
         responses={200: UserSerializer(), 400: "Bad Request", 403: "Forbidden", 404: "Not Found"}
     )
     def patch(self, request, *args, **kwargs):
-        logger.info(f"Partial user update attempted for user ID {kwargs.get('pk')} by {request.user.username}")
+        logger.info("Partial user update attempted for user ID %s by %s", kwargs.get('pk'), request.user.username)
         return super().patch(request, *args, **kwargs)
 
     @swagger_auto_schema(
@@ -190,81 +233,196 @@ class AdminUserDetailView(generics.RetrieveUpdateDestroyAPIView):
         responses={204: "No Content", 403: "Forbidden", 404: "Not Found"}
     )
     def delete(self, request, *args, **kwargs):
-        logger.warning(f"User deletion attempted for user ID {kwargs.get('pk')} by {request.user.username}")
+        logger.warning("User deletion attempted for user ID %s by %s", kwargs.get('pk'), request.user.username)
         return super().delete(request, *args, **kwargs)
 
 # Error handling views
 def bad_request(request, exception=None):
-    logger.error(f"400 Bad Request: {request.path}")
+    logger.error("400 Bad Request: %s", request.path)
     return render(request, 'errors/400.html', status=400)
 
 def permission_denied(request, exception=None):
-    logger.error(f"403 Permission Denied: {request.path}")
+    logger.error("403 Permission Denied: %s", request.path)
     return render(request, 'errors/403.html', status=403)
 
 def page_not_found(request, exception=None):
-    logger.error(f"404 Page Not Found: {request.path}")
+    logger.error("404 Page Not Found: %s", request.path)
     return render(request, 'errors/404.html', status=404)
 
 def server_error(request):
-    logger.critical(f"500 Server Error: {request.path}")
+    logger.critical("500 Server Error: %s", request.path)
     return render(request, 'errors/500.html', status=500)
 
-class APIUserListView(generics.ListAPIView):
+class APIUserListView(ReplicaReadMixin, CachedListMixin, SparseFieldsMixin, generics.ListAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticatedWithUnauthorizedResponse]
-    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    filter_backends = [UserSearchFilter]
 
     @swagger_auto_schema(
-        operation_description="List all users",
+        operation_description="List all users. Filter by prefix with ?username=, ?email=, ?first_name=, "
+                              "?last_name=, ?phone= or by substring with ?search=. Select fields with ?fields=id,username",
         responses={200: UserSerializer(many=True)}
     )
     def get(self, request, *args, **kwargs):
-        logger.info(f"User list accessed by {request.user.username}")
+        logger.info("User list accessed by %s", request.user.username)
         return super().get(request, *args, **kwargs)
 
-class APIUserDetailView(generics.RetrieveAPIView):
+class APIUserExportView(generics.GenericAPIView):
+    queryset = User.objects.all()
+    permission_classes = [IsAdminUser]
+    filter_backends = [UserSearchFilter]
+    pagination_class = None
+    chunk_size = 2000
+
+    @swagger_auto_schema(
+        operation_description="Stream the user directory as NDJSON (default) or CSV. "
+                              "Choose the format with ?output=ndjson|csv; list filters apply.",
+        responses={200: "Streamed export", 400: "Bad Request", 403: "Forbidden"}
+    )
+    def get(self, request, *args, **kwargs):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            return Response({'output': f"Unsupported format '{output}'."}, status=status.HTTP_400_BAD_REQUEST)
+        logger.info("User export (%s) started by %s", output, request.user.username)
+        generate, content_type = EXPORT_FORMATS[output]
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(generate(queryset, self.chunk_size), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="users.{output}"'
+        return response
+
+class APIUserBulkImportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Create users in bulk from a JSON list of rows, or from a CSV/NDJSON "
+                              "file uploaded as multipart field 'file'. Returns per-row errors.",
+        responses={200: "Import report", 400: "Bad Request", 403: "Forbidden"}
+    )
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is not None:
+            fmt = request.data.get('format') or detect_format(upload.name)
+            if fmt not in ('csv', 'ndjson'):
+                return Response({'format': 'Expected a .csv or .ndjson file.'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                check_encoding(upload.chunks())
+            except UnicodeDecodeError:
+                return Response({'file': 'Expected a UTF-8 encoded file.'}, status=status.HTTP_400_BAD_REQUEST)
+            upload.seek(0)
+            rows = read_rows(codecs.iterdecode(upload, 'utf-8'), fmt)
+        elif isinstance(request.data, list):
+            rows = enumerate(request.data, start=1)
+        else:
+            return Response({'detail': 'Expected a list of users or a file upload.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = import_users(rows, batch_size=settings.USER_IMPORT_BATCH_SIZE, workers=settings.USER_IMPORT_WORKERS)
+        logger.info("Bulk import by %s: %s created, %s rejected",
+                    request.user.username, result.created, len(result.errors))
+        return Response(result.as_dict(), status=status.HTTP_200_OK)
+
+class APIUserDetailView(ReplicaReadMixin, CachedRetrieveMixin, SparseFieldsMixin, generics.RetrieveAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated, CanViewProfile]
-    authentication_classes = [SessionAuthentication, BasicAuthentication]
 
     @swagger_auto_schema(
-        operation_description="Retrieve a user by ID",
+        operation_description="Retrieve a user by ID. Select fields with ?fields=id,username",
         responses={200: UserSerializer(), 403: "Forbidden", 404: "Not Found"}
     )
     def get(self, request, *args, **kwargs):
-        logger.info(f"User detail accessed for user ID {kwargs.get('pk')} by {request.user.username}")
+        logger.info("User detail accessed for user ID %s by %s", kwargs.get('pk'), request.user.username)
         return super().get(request, *args, **kwargs)
 
-class APIUserUpdateView(generics.UpdateAPIView):
-    throttle_classes = [UserRateThrottle]
+class APIUserBulkUpdateView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Partially update many users in one transaction. Send a JSON list of "
+                              "UserSerializer fields, each with the user's id. Returns a result per item.",
+        request_body=openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+        responses={200: "Bulk update report", 400: "Bad Request", 403: "Forbidden", 409: "Conflict"}
+    )
+    def patch(self, request):
+        if not isinstance(request.data, list):
+            return Response({'detail': 'Expected a list of users.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            result = bulk_update_users(request.data, batch_size=settings.USER_IMPORT_BATCH_SIZE)
+        except IntegrityError:
+            logger.warning("Bulk update by %s conflicted with a concurrent write", request.user.username)
+            return Response({'detail': 'A concurrent change conflicts with this update; nothing was saved.'},
+                            status=status.HTTP_409_CONFLICT)
+        logger.info("Bulk update by %s: %s updated, %s rejected",
+                    request.user.username, result['updated'], result['failed'])
+        return Response(result, status=status.HTTP_200_OK)
+
+class APIUserBatchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Retrieve several users in one request: ?ids=1,2,3 (at most USER_BATCH_MAX_IDS). "
+                              "IDs that do not exist or may not be viewed are listed in not_found/forbidden.",
+        manual_parameters=[openapi.Parameter('ids', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True)],
+        responses={200: "Users with not_found and forbidden IDs", 400: "Bad Request"}
+    )
+    @replica_reads()
+    def get(self, request):
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in request.query_params.get('ids', '').split(',') if pk.strip()))
+        except ValueError:
+            return Response({'ids': 'Expected a comma-separated list of integer IDs.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not ids:
+            return Response({'ids': 'This parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not all(0 < pk <= MAX_ID for pk in ids):
+            # Out-of-range values would fail in the database driver rather than match nothing
+            return Response({'ids': f'IDs must be between 1 and {MAX_ID}.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > settings.USER_BATCH_MAX_IDS:
+            return Response({'ids': f'At most {settings.USER_BATCH_MAX_IDS} IDs per request.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        users = User.objects.in_bulk(ids)
+        permission = CanViewProfile()
+        results, not_found, forbidden = [], [], []
+        for pk in ids:
+            user = users.get(pk)
+            if user is None:
+                not_found.append(pk)
+            elif not permission.has_object_permission(request, self, user):
+                forbidden.append(pk)
+            else:
+                results.append(user)
+        logger.info("Batch user detail accessed for %s IDs by %s", len(ids), request.user.username)
+        return Response({'results': UserSerializer(results, many=True).data, 'not_found': not_found, 'forbidden': forbidden})
+
+class APIUserUpdateView(ConditionalUpdateMixin, generics.UpdateAPIView):
+    throttle_classes = [SlidingWindowScopedRateThrottle]
+    throttle_scope = 'user_update'
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsOwnerOrAdmin]
 
     @swagger_auto_schema(
-        operation_description="Update a user",
+        operation_description="Update a user. Send If-Match with the ETag from a previous GET to avoid lost updates.",
         request_body=UserSerializer,
-        responses={200: UserSerializer(), 400: "Bad Request", 403: "Forbidden", 404: "Not Found"}
+        responses={200: UserSerializer(), 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 412: "Precondition Failed"}
     )
     def put(self, request, *args, **kwargs):
-        logger.info(f"User update attempted for user ID {kwargs.get('pk')} by {request.user.username}")
+        logger.info("User update attempted for user ID %s by %s", kwargs.get('pk'), request.user.username)
         return super().put(request, *args, **kwargs)
 
     @swagger_auto_schema(
-        operation_description="Partially update a user",
+        operation_description="Partially update a user. Send If-Match with the ETag from a previous GET to avoid lost updates.",
         request_body=UserSerializer,
-        responses={200: UserSerializer(), 400: "Bad Request", 403: "Forbidden", 404: "Not Found"}
+        responses={200: UserSerializer(), 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 412: "Precondition Failed"}
     )
     def patch(self, request, *args, **kwargs):
-        logger.info(f"Partial user update attempted for user ID {kwargs.get('pk')} by {request.user.username}")
+        logger.info("Partial user update attempted for user ID %s by %s", kwargs.get('pk'), request.user.username)
         return super().patch(request, *args, **kwargs)
 
 # Add this new view for API registration
 class APIUserRegistrationView(APIView):
-    throttle_classes = [AnonRateThrottle]
+    throttle_classes = [SlidingWindowScopedRateThrottle]
+    throttle_scope = 'register'
     @swagger_auto_schema(
         request_body=UserRegistrationSerializer,
         responses={201: UserSerializer(), 400: "Bad Request"}
@@ -273,14 +431,16 @@ class APIUserRegistrationView(APIView):
         serializer = UserRegistrationSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            logger.info(f"New user registered: {user.username}")
+            logger.info("New user registered: %s", user.username)
             return Response(UserSerializer(user).data, status=status.HTTP_201_CREATED)
-        logger.warning(f"User registration failed: {serializer.errors}")
+        logger.warning("User registration failed: %s", serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 # Add this new view for API login
 class APIUserLoginView(TokenObtainPairView):
-    throttle_classes = [AnonRateThrottle]
+    serializer_class = CustomTokenObtainPairSerializer
+    throttle_classes = [SlidingWindowScopedRateThrottle]
+    throttle_scope = 'login'
     @swagger_auto_schema(
         request_body=CustomTokenObtainPairSerializer,
         responses={200: openapi.Response("Successful login", CustomTokenObtainPairSerializer)}
@@ -288,9 +448,9 @@ class APIUserLoginView(TokenObtainPairView):
     def post(self, request, *args, **kwargs):
         response = super().post(request, *args, **kwargs)
         if response.status_code == 200:
-            logger.info(f"User logged in via API: {request.data.get('username')}")
+            logger.info("User logged in via API: %s", request.data.get('username'))
         else:
-            logger.warning(f"Failed login attempt via API for user: {request.data.get('username')}")
+            logger.warning("Failed login attempt via API for user: %s", request.data.get('username'))
         return response
 
 